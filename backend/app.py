@@ -1,17 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from .database import Base, engine, get_db
-from . import crud, models, schemas
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from src.observability import MetricsMiddleware, metrics_endpoint
+from .cache import QueryCache, normalize_query
+from .database import Base, SessionLocal, engine, get_read_db
+from . import crud, models, qa, schemas
+from .fts import ensure_fts
+from .jobs import ExtractionJobs, Job, JobQueueFull
 
 import hashlib
-import io
-import pdfplumber
+import os
+import tempfile
 
-# Dev-only table creation; swap to Alembic in prod
-Base.metadata.create_all(bind=engine)
+UPLOAD_CHUNK_BYTES = 1 << 20
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
 
-app = FastAPI(title="AI Portfolio Backend - Text Store")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Dev-only table creation; swap to Alembic in prod
+    Base.metadata.create_all(bind=engine)
+    ensure_fts(engine)
+    extraction_jobs.start()
+    qa.startup()
+    yield
+    qa.shutdown()
+    extraction_jobs.shutdown()
+
+app = FastAPI(title="AI Portfolio Backend - Text Store", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,56 +37,216 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Latency histograms + Server-Timing; X-Profile: $PROFILE_TOKEN samples the process
+# (all threads) while one request runs.
+app.add_middleware(MetricsMiddleware, profile_token=os.getenv("PROFILE_TOKEN"),
+                   profile_dir=os.getenv("PROFILE_DIR", "profiles"))
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+def _save_job(job: Job):
+    db = SessionLocal()
+    try:
+        crud.save_job(db, job, keep=extraction_jobs.history)
+    finally:
+        db.close()
+
+# Job rows go to SQLite, so any uvicorn worker can answer /jobs/{id}.
+extraction_jobs = ExtractionJobs(save=_save_job)
+# Keyed on the newest document id: an upload committed by any worker invalidates it.
+search_cache = QueryCache("search")
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "up"}
+
+@app.get("/ready")
+def ready(response: Response):
+    """Readiness: 200 once every QA corpus index is loaded, 503 while loading."""
+    loaded = qa.corpora.ready()
+    if not loaded:
+        response.status_code = 503
+    return {
+        "status": "ready" if loaded else "loading",
+        "corpora": {name: {"chunks": s["chunks"], "building": s["building"], "error": s["error"]}
+                    for name, s in qa.corpora.status().items()},
+    }
+
+# Read endpoints use the query_only read engine (a sync Session run in a worker
+# thread, or an AsyncSession with APP_DB_ASYNC=1), never the single writer.
 
 @app.get("/documents", response_model=list[schemas.DocumentOut])
-def list_docs(limit: int = 50, offset: int = 0, db: Session = Depends(get_db)):
-    return crud.list_documents(db, limit=limit, offset=offset)
+async def list_docs(limit: int = 50, offset: int = 0, db=Depends(get_read_db)):
+    return await crud.list_documents_async(db, limit=limit, offset=offset)
+
+def _chunk_out(chunk: models.Chunk, include_text: bool) -> schemas.ChunkOut:
+    return schemas.ChunkOut(
+        id=chunk.id,
+        page_id=chunk.page_id,
+        chunk_index=chunk.chunk_index,
+        text=chunk.text if include_text else None,
+        start_char=chunk.start_char,
+        end_char=chunk.end_char,
+    )
+
+def _page_out(page: models.Page, include_text: bool, include_chunks: bool) -> schemas.PageOut:
+    # Built explicitly so skipped attributes are never touched (no lazy loads).
+    return schemas.PageOut(
+        id=page.id,
+        document_id=page.document_id,
+        page_number=page.page_number,
+        text=page.text if include_text else None,
+        char_count=page.char_count,
+        chunks=[_chunk_out(c, include_text) for c in page.chunks] if include_chunks else [],
+    )
 
 @app.get("/documents/{doc_id}", response_model=schemas.DocumentDetailOut)
-def get_doc_detail(doc_id: int, db: Session = Depends(get_db)):
-    doc = crud.get_document_detail(db, doc_id)
+async def get_doc_detail(
+    doc_id: int,
+    include_text: bool = True,
+    include_chunks: bool = False,
+    db=Depends(get_read_db),
+):
+    """Document with its pages; page/chunk rows are eager-loaded in a fixed number of queries."""
+    doc = await crud.get_document_detail_async(db, doc_id, include_text=include_text, include_chunks=include_chunks)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-    return doc
+    out = schemas.DocumentOut.model_validate(doc)
+    return schemas.DocumentDetailOut(
+        **out.model_dump(),
+        pages=[_page_out(p, include_text, include_chunks) for p in doc.pages],
+    )
+
+@app.get("/documents/{doc_id}/pages", response_model=list[schemas.PageOut])
+async def list_doc_pages(
+    doc_id: int,
+    limit: int = 50,
+    after: int = 0,
+    include_text: bool = True,
+    include_chunks: bool = False,
+    db=Depends(get_read_db),
+):
+    """Pages with page_number > `after`; pass the last page_number back to continue."""
+    limit = max(1, min(limit, 500))
+    pages = await crud.list_pages_async(db, doc_id, limit=limit, after=after,
+                            include_text=include_text, include_chunks=include_chunks)
+    return [_page_out(p, include_text, include_chunks) for p in pages]
+
+@app.get("/pages/{page_id}/chunks", response_model=list[schemas.ChunkOut])
+async def list_page_chunks(
+    page_id: int,
+    limit: int = 50,
+    after: int = -1,
+    include_text: bool = True,
+    db=Depends(get_read_db),
+):
+    """Chunks with chunk_index > `after`; pass the last chunk_index back to continue."""
+    limit = max(1, min(limit, 500))
+    chunks = await crud.list_chunks_async(db, page_id, limit=limit, after=after, include_text=include_text)
+    return [_chunk_out(c, include_text) for c in chunks]
+
+def _spool_chunk(tmp, hasher, chunk: bytes):
+    hasher.update(chunk)
+    tmp.write(chunk)
+
+async def _spool_upload(file: UploadFile) -> tuple[str, str]:
+    """
+    Stream an upload to a temp file in fixed-size chunks, hashing as bytes arrive,
+    so memory stays bounded regardless of file size. Returns (path, sha256).
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    try:
+        with tmp:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                await run_in_threadpool(_spool_chunk, tmp, hasher, chunk)
+    except BaseException:
+        os.remove(tmp.name)
+        raise
+    return tmp.name, hasher.hexdigest()
+
+def _persist_pages(job: Job, page_texts: list[str]) -> int:
+    db = SessionLocal()
+    try:
+        doc = crud.upsert_document_with_pages(
+            db,
+            filename=job.filename,
+            sha256=job.sha256,
+            page_texts=page_texts,
+        )
+        return doc.id
+    except IntegrityError:
+        # An identical upload (possibly in another worker) committed first.
+        db.rollback()
+        existing = crud.get_document_by_hash(db, job.sha256)
+        if existing is None:
+            raise
+        return existing.id
+    finally:
+        db.close()
 
-@app.post("/upload-pdf", response_model=schemas.DocumentDetailOut)
-async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@app.post("/upload-pdf", response_model=schemas.JobOut, status_code=202)
+async def upload_pdf(response: Response, file: UploadFile = File(...), db=Depends(get_read_db)):
+    """
+    Queue a PDF for background text extraction; poll `/jobs/{id}` for progress.
+    Re-uploading a known file returns an already-finished job (200).
+    """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
-    raw = await file.read()
-    sha256 = hashlib.sha256(raw).hexdigest()
+    path, sha256 = await _spool_upload(file)
 
-    # Idempotent re-upload: return existing doc if hash matches
-    existing = crud.get_document_by_hash(db, sha256)
+    # Idempotent re-upload: point at the existing doc if hash matches (before any parsing)
+    existing = await crud.get_document_by_hash_async(db, sha256)
     if existing:
-        return existing
+        os.remove(path)
+        response.status_code = 200
+        return await extraction_jobs.add_finished(file.filename, sha256, existing.id)
 
-    # Extract page texts with pdfplumber
     try:
-        page_texts: list[str] = []
-        with pdfplumber.open(io.BytesIO(raw)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                page_texts.append(text.strip())
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read PDF: {e}")
-
-    doc = crud.upsert_document_with_pages(
-        db,
-        filename=file.filename,
-        sha256=sha256,
-        page_texts=page_texts,
-    )
-    return doc
+        job = await extraction_jobs.submit(path, file.filename, sha256, _persist_pages)
+    except JobQueueFull as e:
+        os.remove(path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobOut)
+async def get_job(job_id: str, db=Depends(get_read_db)):
+    # This worker's own jobs are read from memory; others' from their recorded row.
+    job = extraction_jobs.get(job_id) or await crud.get_job_async(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-@app.get("/search", response_model=list[schemas.PageOut])
-def search_pages(q: str, limit: int = 20, db: Session = Depends(get_db)):
+@app.get("/search", response_model=schemas.SearchResultsOut)
+async def search_pages(q: str, limit: int = 20, cursor: str | None = None, fragments: int = 1,
+                       db=Depends(get_read_db)):
+    """
+    BM25-ranked full-text search over page text.
+    Supports "exact phrases" and prefix* terms; pass `next_cursor` back as `cursor` for the next page.
+    `fragments` > 1 returns that many highlighted windows per page in `snippet`.
+    """
     q = (q or "").strip()
     if len(q) < 2:
         raise HTTPException(status_code=400, detail="Query too short")
-    return crud.search_pages(db, q=q, limit=limit)
+    limit = max(1, min(limit, 100))
+    fragments = max(1, min(fragments, 5))
+    key = (await crud.documents_version_async(db), normalize_query(q), limit, cursor, fragments)
+    cached = search_cache.get(key)
+    if cached is None:
+        try:
+            cached = await crud.search_pages_async(db, q=q, limit=limit, cursor=cursor, fragments=fragments)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        hits, _ = cached
+        search_cache.put(key, cached, sum(len(h["snippet"]) + 200 for h in hits))
+    hits, next_cursor = cached
+    return schemas.SearchResultsOut(query=q, hits=hits, next_cursor=next_cursor)
 
 
-from .qa import router as qa_router
-app.include_router(qa_router)
+app.include_router(qa.router)
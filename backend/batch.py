@@ -0,0 +1,115 @@
+"""
+Batch question answering for offline evaluation, shared by POST /qa/batch and
+scripts/qa_batch.py.
+
+Input is NDJSON: one JSON object per line with the question under `field`
+(default "question") and an optional id under `id_field` (default "id"; the
+line number when absent), or a bare JSON string. Questions are answered
+`batch_size` at a time: lexical mode vectorizes a batch with one transform
+call and scores it with one sparse product (SimpleRetriever.query_many).
+Output is one JSON object per input line, in input order; malformed lines
+produce an `error` object instead of aborting the run.
+"""
+from __future__ import annotations
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+import codecs
+import json
+
+from .highlight import highlight, query_pattern
+
+BATCH_SIZE = 256
+MAX_QUESTION_CHARS = 10_000
+
+
+def parse_line(line: str, line_no: int, field: str = "question", id_field: str = "id") -> Optional[dict]:
+    """
+    {"id", "question"} for one input line, {"id", "error"} if it is unusable,
+    or None for blank lines.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as ex:
+        return {"id": line_no, "error": f"invalid JSON: {ex.msg}"}
+    if isinstance(record, str):
+        record = {field: record}
+    if not isinstance(record, dict):
+        return {"id": line_no, "error": "expected a JSON object or string"}
+    rid = record.get(id_field, line_no)
+    question = record.get(field)
+    if not isinstance(question, str) or len(question.strip()) < 2:
+        return {"id": rid, "error": f"missing or too short '{field}'"}
+    return {"id": rid, "question": question[:MAX_QUESTION_CHARS]}
+
+
+def answer_batch(retriever, records: List[dict], top_k: int = 3, mode: str = "lexical",
+                 candidates: int = 200, reranker=None, with_text: bool = False,
+                 with_highlight: bool = False) -> List[dict]:
+    """Answer parsed records (error records pass through) and return one output row each."""
+    todo = [r for r in records if "question" in r]
+    questions = [r["question"] for r in todo]
+    if mode == "lexical":
+        hits = retriever.query_many(questions, top_k=top_k)
+    else:
+        hits = [retriever.query_hybrid(q, top_k=top_k, candidates=candidates, reranker=reranker)[0]
+                for q in questions]
+    answers = {id(r): h for r, h in zip(todo, hits)}
+
+    out = []
+    for r in records:
+        if "question" not in r:
+            out.append(r)
+            continue
+        pattern = query_pattern(r["question"]) if with_highlight else None
+        passages = []
+        for c, score in answers[id(r)]:
+            p = {"doc_id": c.doc_id, "source_path": c.source_path, "score": round(score, 6)}
+            if with_text:
+                p["text"] = c.text
+            if with_highlight:
+                p["highlighted"] = highlight(c.text, pattern)
+            passages.append(p)
+        out.append({"id": r["id"], "question": r["question"], "answers": passages})
+    return out
+
+
+async def aiter_lines(chunks: AsyncIterable[bytes], max_chars: int = 1 << 20) -> AsyncIterator[str]:
+    """
+    Lines of a UTF-8 byte stream as it arrives. A line longer than `max_chars`
+    is cut there (the rest of it is dropped), so memory stays bounded.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, skipping = "", False
+    async for chunk in chunks:
+        buf += decoder.decode(chunk)
+        *lines, buf = buf.split("\n")
+        for line in lines:
+            if not skipping:
+                yield line
+            skipping = False
+        if len(buf) > max_chars:
+            if not skipping:
+                yield buf[:max_chars]
+            buf, skipping = "", True
+    buf += decoder.decode(b"", final=True)
+    if buf and not skipping:
+        yield buf
+
+
+def iter_batches(records: Iterable[Optional[dict]], batch_size: int = BATCH_SIZE) -> Iterator[List[dict]]:
+    batch: List[dict] = []
+    for r in records:
+        if r is None:
+            continue
+        batch.append(r)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def to_ndjson(rows: Iterable[dict]) -> str:
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
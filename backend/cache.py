@@ -0,0 +1,96 @@
+"""
+In-process LRU + TTL cache for query results (/qa and /search).
+
+Keys include a version stamp of the data they were computed from (the
+retriever build for /qa, the latest document id for /search), so a rebuild or
+an upload makes old entries unreachable; they then age out through LRU/TTL
+eviction. Size is bounded both by entry count and by an approximate byte
+budget supplied by the caller per entry.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import os
+import threading
+import time
+
+from src.observability import REGISTRY
+
+CACHE_ENTRIES = int(os.getenv("QUERY_CACHE_ENTRIES", "2048"))  # 0 disables caching
+CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))  # seconds
+
+CACHE_LOOKUPS = REGISTRY.counter(
+    "query_cache_lookups_total", "Query cache lookups by cache and result (hit/miss).", ["cache", "result"]
+)
+CACHE_EVICTIONS = REGISTRY.counter(
+    "query_cache_evictions_total", "Entries dropped for size or age.", ["cache"]
+)
+
+
+def normalize_query(q: str) -> str:
+    """Case- and whitespace-insensitive form: retrieval, FTS and highlighting all ignore both."""
+    return " ".join(q.lower().split())
+
+
+class QueryCache:
+    def __init__(self, name: str, max_entries: int = CACHE_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()  # key -> (expires, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        CACHE_LOOKUPS.inc(cache=self.name, result="miss" if entry is None else "hit")
+        return None if entry is None else entry[2]
+
+    def put(self, key: Hashable, value: Any, size: int):
+        """Store `value`; `size` is its approximate footprint in bytes."""
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key, evicted=False)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": int(CACHE_LOOKUPS.value(cache=self.name, result="hit")),
+            "misses": int(CACHE_LOOKUPS.value(cache=self.name, result="miss")),
+        }
+
+    def _drop(self, key: Hashable, evicted: bool = True):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        if evicted:
+            CACHE_EVICTIONS.inc(cache=self.name)
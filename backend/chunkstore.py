@@ -0,0 +1,208 @@
+"""
+Columnar chunk storage for the retriever.
+
+Instead of one DocChunk (with its own source path string, formatted doc_id and
+meta dict) per chunk, chunks are stored as parallel integer columns plus one
+text table:
+
+- source_ids: index into an interned list of source paths
+- types:      integer type code (see CHUNK_TYPES)
+- pages:      PDF page number (-1 otherwise)
+- indexes:    paragraph index (txt/pdf) or row index (csv)
+- schema_ids: index into per-file CSV column lists (-1 otherwise)
+
+DocChunk objects are only materialized as views when a chunk is read.
+"""
+from __future__ import annotations
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence as SequenceT, Union
+import os
+
+import numpy as np
+
+CHUNK_TYPES = ("txt", "pdf", "csv")
+TYPE_CODES = {name: code for code, name in enumerate(CHUNK_TYPES)}
+TXT, PDF, CSV = (TYPE_CODES[t] for t in CHUNK_TYPES)
+
+_COLUMNS = ("source_ids", "types", "pages", "indexes", "schema_ids")
+
+
+@dataclass
+class DocChunk:
+    doc_id: str
+    source_path: str
+    text: str
+    meta: dict
+
+
+class StringTable(Sequence):
+    """Strings stored as one UTF-8 blob plus an offsets array (offsets[i]:offsets[i+1])."""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_strings(cls, strings: SequenceT[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.raw(i).decode("utf-8")
+
+    def find(self, key: bytes) -> int:
+        """Index of `key` in a table sorted by bytes, or -1."""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self.raw(lo) == key else -1
+
+
+class ChunkStore(Sequence):
+    def __init__(self):
+        self.sources: List[str] = []
+        self.schemas: List[List[str]] = []
+        self._source_index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self.texts: Union[List[str], StringTable] = []
+        # array('i') while appending; numpy arrays once loaded from disk
+        self.source_ids = array("i")
+        self.types = array("b")
+        self.pages = array("i")
+        self.indexes = array("q")
+        self.schema_ids = array("i")
+
+    # ---------- building ----------
+
+    @property
+    def names(self) -> List[str]:
+        """Per-source display names used in doc_ids (basename unless given)."""
+        return self._names
+
+    def add_source(self, path: str, name: Optional[str] = None) -> int:
+        sid = self._source_index.get(path)
+        if sid is None:
+            sid = self._source_index[path] = len(self.sources)
+            self.sources.append(path)
+            self._names.append(name or os.path.basename(path))
+        return sid
+
+    def add_schema(self, columns: SequenceT) -> int:
+        self.schemas.append([str(c) for c in columns])
+        return len(self.schemas) - 1
+
+    def append(self, source_id: int, type_code: int, index: int, text: str,
+               page: int = -1, schema_id: int = -1):
+        self.source_ids.append(source_id)
+        self.types.append(type_code)
+        self.pages.append(page)
+        self.indexes.append(index)
+        self.schema_ids.append(schema_id)
+        self.texts.append(text)
+
+    def extend(self, source_id: int, type_code: int, indexes: SequenceT[int], texts: SequenceT[str],
+               schema_id: int = -1):
+        """Append many chunks of one source at once (no pages)."""
+        n = len(texts)
+        self.source_ids.extend([source_id] * n)
+        self.types.extend([type_code] * n)
+        self.pages.extend([-1] * n)
+        self.indexes.extend(int(i) for i in indexes)
+        self.schema_ids.extend([schema_id] * n)
+        self.texts.extend(texts)
+
+    def truncate(self, n: int):
+        """Drop chunks from index `n` on (e.g. a file that failed halfway through loading)."""
+        for name in _COLUMNS:
+            del getattr(self, name)[n:]
+        del self.texts[n:]
+
+    def extend_from(self, other: "ChunkStore", start: int, stop: int):
+        """Copy chunks [start, stop) of `other`, re-interning sources and schemas."""
+        source_map: Dict[int, int] = {}
+        schema_map: Dict[int, int] = {-1: -1}
+        for i in range(start, stop):
+            sid = int(other.source_ids[i])
+            if sid not in source_map:
+                source_map[sid] = self.add_source(other.sources[sid], other.names[sid])
+            scid = int(other.schema_ids[i])
+            if scid not in schema_map:
+                schema_map[scid] = self.add_schema(other.schemas[scid])
+            self.append(source_map[sid], int(other.types[i]), int(other.indexes[i]),
+                        other.texts[i], page=int(other.pages[i]), schema_id=schema_map[scid])
+
+    # ---------- reading ----------
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def doc_id(self, i: int) -> str:
+        name = self._names[self.source_ids[i]]
+        t = self.types[i]
+        if t == PDF:
+            return f"{name}#p{self.pages[i]}c{self.indexes[i]}"
+        if t == CSV:
+            return f"{name}#r{self.indexes[i]}"
+        return f"{name}#c{self.indexes[i]}"
+
+    def meta(self, i: int) -> dict:
+        t = self.types[i]
+        if t == PDF:
+            return {"type": "pdf", "page": int(self.pages[i])}
+        if t == CSV:
+            return {"type": "csv", "row_index": int(self.indexes[i]),
+                    "columns": list(self.schemas[self.schema_ids[i]])}
+        return {"type": "txt", "chunk_index": int(self.indexes[i])}
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return DocChunk(
+            doc_id=self.doc_id(i),
+            source_path=self.sources[self.source_ids[i]],
+            text=self.texts[i],
+            meta=self.meta(i),
+        )
+
+    # ---------- (de)serialization ----------
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Columns + text table as numpy arrays (sources/schemas go in a JSON header)."""
+        texts = self.texts if isinstance(self.texts, StringTable) else StringTable.from_strings(self.texts)
+        out = {name: np.asarray(getattr(self, name)) for name in _COLUMNS}
+        out["text_offsets"], out["text_blob"] = texts.offsets, texts.blob
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], sources: List[str],
+                    schemas: List[List[str]], names: Optional[List[str]] = None) -> "ChunkStore":
+        """Wrap arrays (possibly memmap views) without copying them."""
+        store = cls()
+        for i, path in enumerate(sources):
+            store.add_source(path, names[i] if names else None)
+        store.schemas = [list(s) for s in schemas]
+        for name in _COLUMNS:
+            setattr(store, name, arrays[name])
+        store.texts = StringTable(arrays["text_offsets"], arrays["text_blob"])
+        return store
@@ -0,0 +1,182 @@
+"""
+Named QA corpora, each with its own SimpleRetriever.
+
+Rebuilds run in a background thread against a fresh retriever (which reuses
+the corpus' persisted index, so only changed files are re-parsed); the new
+retriever is then swapped in with a single reference assignment. Queries grab
+the current retriever once, so in-flight requests keep using the old index.
+
+The retriever module (scikit-learn, scipy) is imported on first build, not
+when this module is imported.
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+import re
+import threading
+
+if TYPE_CHECKING:
+    from .retriever import SimpleRetriever
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def parse_corpora(spec: str) -> Dict[str, Path]:
+    """'default=sample_data,legal=/data/legal' -> {name: dir}."""
+    out: Dict[str, Path] = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, path = item.partition("=")
+        name = name.strip()
+        if not _NAME_RE.match(name) or not path.strip():
+            raise ValueError(f"Invalid corpus spec: {item!r}")
+        out[name] = Path(path.strip())
+    return out
+
+
+class CorpusRegistry:
+    def __init__(self, index_dir: Path, embedder=None, embedding_cache_dir: Optional[Path] = None,
+                 retriever_options: Optional[dict] = None):
+        self.index_dir = Path(index_dir)
+        self.embedder = embedder
+        self.embedding_cache_dir = embedding_cache_dir
+        # Extra SimpleRetriever arguments (recursive, workers, file_timeout, csv_*).
+        self.retriever_options = dict(retriever_options or {})
+        self._dirs: Dict[str, Path] = {}
+        # Replaced wholesale on every swap (copy-on-write); readers never see a half-built index.
+        self._retrievers: Dict[str, SimpleRetriever] = {}
+        self._status: Dict[str, dict] = {}
+        self._building: set[str] = set()
+        # One build per corpus at a time (startup, watcher and admin rebuilds all
+        # write the same index files); a second synchronous build waits its turn.
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register(self, name: str, data_dir: Path):
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid corpus name: {name!r}")
+        self._dirs[name] = Path(data_dir)
+        self._build_locks.setdefault(name, threading.Lock())
+        self._status.setdefault(name, {"chunks": 0, "building": False, "built_at": None, "error": None})
+
+    def names(self) -> List[str]:
+        return list(self._dirs)
+
+    def data_dir(self, name: str) -> Optional[Path]:
+        return self._dirs.get(name)
+
+    def get(self, name: str) -> Optional[SimpleRetriever]:
+        return self._retrievers.get(name)
+
+    def ready(self) -> bool:
+        """True once every registered corpus has a loaded index."""
+        return all(name in self._retrievers for name in self._dirs)
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: {**self._status[name], "data_dir": str(self._dirs[name])}
+            for name in self._dirs
+        }
+
+    def _new_retriever(self, name: str) -> SimpleRetriever:
+        from .retriever import SimpleRetriever
+        return SimpleRetriever(
+            self._dirs[name],
+            index_path=self.index_dir / f"{name}.npz",
+            embedder=self.embedder,
+            embedding_cache_dir=self.embedding_cache_dir,
+            **self.retriever_options,
+        )
+
+    def build(self, name: str) -> int:
+        """
+        Build `name` synchronously and swap it in. Returns the chunk count.
+        Waits for a build of the same corpus already in progress.
+        """
+        with self._build_locks[name]:
+            return self._build_locked(name)
+
+    def _build_locked(self, name: str) -> int:
+        with self._lock:
+            self._building.add(name)
+            self._status[name]["building"] = True
+        try:
+            retriever = self._new_retriever(name)
+            n = retriever.build()
+            with self._lock:
+                self._retrievers = {**self._retrievers, name: retriever}
+                self._status[name].update(
+                    chunks=n,
+                    built_at=datetime.now(timezone.utc).isoformat(),
+                    error=None,
+                    stats=retriever.build_stats,
+                )
+            return n
+        except Exception as ex:
+            self._status[name]["error"] = str(ex)
+            raise
+        finally:
+            with self._lock:
+                self._building.discard(name)
+                self._status[name]["building"] = False
+
+    def build_all(self):
+        for name in self.names():
+            try:
+                n = self.build(name)
+                print(f"[qa] Corpus '{name}' ready with {n} chunks from {self._dirs[name]}")
+                for err in self._status[name]["stats"]["errors"]:
+                    print(f"[qa] Corpus '{name}': skipped {err['path']}: {err['error']}")
+            except Exception as ex:
+                print(f"[qa] Corpus '{name}' failed to build: {ex}")
+
+    def rebuild_async(self, name: str) -> bool:
+        """Start a background rebuild; False if one is already running."""
+        with self._lock:
+            if name in self._building:
+                return False
+            self._building.add(name)
+            self._status[name]["building"] = True
+        threading.Thread(target=self._rebuild_quietly, args=(name,), daemon=True,
+                         name=f"corpus-rebuild-{name}").start()
+        return True
+
+    def _rebuild_quietly(self, name: str):
+        try:
+            self.build(name)
+        except Exception as ex:
+            print(f"[qa] Rebuild of corpus '{name}' failed: {ex}")
+
+    # ---------- filesystem watcher (polling) ----------
+
+    def _fingerprint(self, name: str) -> tuple:
+        from .retriever import SimpleRetriever
+        files = []
+        for path in SimpleRetriever(self._dirs[name], **self.retriever_options).discover():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((str(path), st.st_mtime_ns, st.st_size))
+        return tuple(files)
+
+    def watch(self, interval: float):
+        """Poll corpus directories every `interval` seconds and rebuild on change."""
+        if self._watcher is not None or interval <= 0:
+            return
+        seen = {name: self._fingerprint(name) for name in self.names()}
+
+        def loop():
+            while not self._stop.wait(interval):
+                for name in self.names():
+                    fp = self._fingerprint(name)
+                    if fp != seen.get(name) and self.rebuild_async(name):
+                        seen[name] = fp
+
+        self._watcher = threading.Thread(target=loop, daemon=True, name="corpus-watcher")
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
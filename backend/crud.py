@@ -1,15 +1,29 @@
-from typing import Iterable, List
-from sqlalchemy import select
-from sqlalchemy.orm import Session
-from . import models
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from functools import wraps
+from itertools import islice
+import asyncio
+import html
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session, defer, raiseload, selectinload
+from src.nlp.tokenization import Chunker, default_chunker
+from src.observability import span
+from . import fts, models
+from .highlight import highlight, query_pattern
+
+BULK_BATCH_SIZE = 500
 
 def get_document_by_hash(db: Session, sha256: str) -> models.Document | None:
     return db.query(models.Document).filter(models.Document.sha256 == sha256).first()
 
+def documents_version(db: Session) -> int:
+    """Highest document id: changes whenever an ingest commits (documents are never updated in place)."""
+    return db.execute(text("SELECT COALESCE(MAX(id), 0) FROM documents")).scalar_one()
+
 def create_document(db: Session, filename: str, sha256: str, num_pages: int) -> models.Document:
     doc = models.Document(filename=filename, sha256=sha256, num_pages=num_pages)
     db.add(doc)
-    db.flush()  # assign id
+    with span("db_flush"):
+        db.flush()  # assign id
     return doc
 
 def add_pages(db: Session, document: models.Document, page_texts: Iterable[str]) -> List[models.Page]:
@@ -26,13 +40,54 @@ def add_pages(db: Session, document: models.Document, page_texts: Iterable[str])
         pages.append(p)
     return pages
 
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+def bulk_add_pages(
+    db: Session,
+    document_id: int,
+    page_texts: Iterable[str],
+    chunker: Optional[Chunker] = None,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> Tuple[int, int]:
+    """
+    Insert pages and their chunks with executemany-style Core inserts, one
+    statement per batch, bypassing per-object ORM bookkeeping. Chunks come from
+    `chunker` (the shared default, as used by the QA retriever, if omitted) and
+    carry start/end offsets into the page text. Caller commits.
+    Returns (pages inserted, chunks inserted).
+    """
+    chunker = chunker or default_chunker()
+    page_stmt = insert(models.Page).returning(models.Page.id, sort_by_parameter_order=True)
+    n_pages = n_chunks = 0
+    numbered = enumerate(((t or "").strip() for t in page_texts), start=1)
+    for batch in _batched(numbered, batch_size):
+        page_ids = db.execute(page_stmt, [
+            {"document_id": document_id, "page_number": idx, "text": t, "char_count": len(t)}
+            for idx, t in batch
+        ]).scalars().all()
+        chunk_rows = [
+            {"page_id": page_id, "chunk_index": c_i, "text": t[s:e], "start_char": s, "end_char": e}
+            for page_id, (_, t) in zip(page_ids, batch)
+            for c_i, (s, e) in enumerate(chunker.spans(t))
+        ]
+        for rows in _batched(chunk_rows, batch_size):
+            db.execute(insert(models.Chunk), rows)
+        n_pages += len(batch)
+        n_chunks += len(chunk_rows)
+    return n_pages, n_chunks
+
 def upsert_document_with_pages(db: Session, filename: str, sha256: str, page_texts: list[str]) -> models.Document:
     existing = get_document_by_hash(db, sha256)
     if existing:
         return existing  # idempotent re-upload
     doc = create_document(db, filename=filename, sha256=sha256, num_pages=len(page_texts))
-    add_pages(db, doc, page_texts)
-    db.commit()
+    with span("db_flush"):
+        bulk_add_pages(db, doc.id, page_texts)
+    with span("db_commit"):
+        db.commit()
     db.refresh(doc)
     return doc
 
@@ -43,9 +98,208 @@ def list_documents(db: Session, limit: int = 50, offset: int = 0) -> list[models
           .offset(offset).limit(limit).all()
     )
 
-def get_document_detail(db: Session, doc_id: int) -> models.Document | None:
-    return db.query(models.Document).filter(models.Document.id == doc_id).first()
+def _page_load_options(include_text: bool, include_chunks: bool) -> list:
+    """
+    Loader options for Page rows: chunks come in one extra SELECT ... IN for the
+    whole batch (never per page), and skipped text columns are not fetched at all
+    (raiseload guards against an accidental lazy load per row).
+    """
+    opts = []
+    if not include_text:
+        opts.append(defer(models.Page.text, raiseload=True))
+    if include_chunks:
+        chunks = selectinload(models.Page.chunks)
+        if not include_text:
+            chunks = chunks.defer(models.Chunk.text, raiseload=True)
+        opts.append(chunks)
+    else:
+        opts.append(raiseload(models.Page.chunks))
+    return opts
+
+def get_document_detail(
+    db: Session, doc_id: int, include_text: bool = True, include_chunks: bool = False
+) -> models.Document | None:
+    stmt = (
+        select(models.Document)
+        .where(models.Document.id == doc_id)
+        .options(selectinload(models.Document.pages).options(
+            *_page_load_options(include_text, include_chunks)
+        ))
+    )
+    return db.execute(stmt).scalars().first()
 
-def search_pages(db: Session, q: str, limit: int = 20) -> list[models.Page]:
-    stmt = select(models.Page).where(models.Page.text.like(f"%{q}%")).limit(limit)
+def list_pages(
+    db: Session,
+    doc_id: int,
+    limit: int = 50,
+    after: int = 0,
+    include_text: bool = True,
+    include_chunks: bool = False,
+) -> list[models.Page]:
+    """Pages of a document with page_number > `after` (keyset pagination)."""
+    stmt = (
+        select(models.Page)
+        .where(models.Page.document_id == doc_id, models.Page.page_number > after)
+        .order_by(models.Page.page_number)
+        .limit(limit)
+        .options(*_page_load_options(include_text, include_chunks))
+    )
     return db.execute(stmt).scalars().all()
+
+def list_chunks(
+    db: Session, page_id: int, limit: int = 50, after: int = -1, include_text: bool = True
+) -> list[models.Chunk]:
+    """Chunks of a page with chunk_index > `after` (keyset pagination)."""
+    stmt = (
+        select(models.Chunk)
+        .where(models.Chunk.page_id == page_id, models.Chunk.chunk_index > after)
+        .order_by(models.Chunk.chunk_index)
+        .limit(limit)
+    )
+    if not include_text:
+        stmt = stmt.options(defer(models.Chunk.text, raiseload=True))
+    return db.execute(stmt).scalars().all()
+
+def _encode_cursor(score: float, row_id: int) -> str:
+    return f"{score!r}:{row_id}"
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    score, _, row_id = cursor.partition(":")
+    return float(score), int(row_id)
+
+def _fts_search(
+    db: Session,
+    fts_table: str,
+    columns: str,
+    join: str,
+    q: str,
+    limit: int,
+    cursor: Optional[str],
+    snippet_tokens: int,
+    text_column: str,
+    fragments: int = 1,
+) -> Tuple[list[dict], Optional[str]]:
+    """
+    BM25-ranked FTS5 query with a highlighted snippet per hit and keyset
+    pagination on (bm25, rowid). The cursor avoids OFFSET row skipping, but
+    FTS5 still ranks every match before the keyset filter, so each page costs
+    O(matches). A cursor is only stable while the corpus is unchanged: inserts
+    shift the bm25 statistics, so scores move between pages.
+    With `fragments` > 1 the snippet is built by backend.highlight from the
+    row text instead (several windows around matches, FTS5 gives only one).
+    """
+    match = fts.to_match_query(q)
+    if not match:
+        return [], None
+    params = {
+        "q": match,
+        "limit": limit + 1,
+        "mo": fts.MARK_OPEN,
+        "mc": fts.MARK_CLOSE,
+        "tokens": snippet_tokens,
+    }
+    keyset = ""
+    if cursor:
+        params["score"], params["after"] = _decode_cursor(cursor)
+        keyset = (f"AND (bm25({fts_table}) > :score OR "
+                  f"(bm25({fts_table}) = :score AND {fts_table}.rowid > :after))")
+    snippet_sql = (f"{text_column} AS snippet" if fragments > 1
+                   else f"snippet({fts_table}, 0, :mo, :mc, '…', :tokens) AS snippet")
+    stmt = text(f"""
+        SELECT {columns},
+               bm25({fts_table}) AS bm25,
+               {snippet_sql}
+          FROM {fts_table} {join}
+         WHERE {fts_table} MATCH :q {keyset}
+         ORDER BY bm25, {fts_table}.rowid
+         LIMIT :limit
+    """)
+    with span("fts_search"):
+        rows = db.execute(stmt, params).mappings().all()
+
+    pattern = query_pattern(q, min_len=1, max_terms=16, whole_words=True) if fragments > 1 else None
+    hits = []
+    for r in rows[:limit]:
+        hit = dict(r)
+        bm25 = hit.pop("bm25")
+        hit["score"] = -bm25  # FTS5 bm25() is "lower is better"
+        if fragments > 1:
+            hit["snippet"] = highlight(hit["snippet"] or "", pattern,
+                                       max_chars=snippet_tokens * 8 * fragments, fragments=fragments)
+        else:
+            hit["snippet"] = (html.escape(hit["snippet"] or "")
+                              .replace(fts.MARK_OPEN, "<mark>")
+                              .replace(fts.MARK_CLOSE, "</mark>"))
+        hits.append(hit)
+    next_cursor = None
+    if len(rows) > limit and hits:
+        next_cursor = _encode_cursor(-hits[-1]["score"], hits[-1]["id"])
+    return hits, next_cursor
+
+def search_pages(
+    db: Session, q: str, limit: int = 20, cursor: Optional[str] = None, fragments: int = 1
+) -> Tuple[list[dict], Optional[str]]:
+    return _fts_search(
+        db, "pages_fts",
+        columns="p.id, p.document_id, p.page_number, p.char_count",
+        join="JOIN pages p ON p.id = pages_fts.rowid",
+        q=q, limit=limit, cursor=cursor, snippet_tokens=24,
+        text_column="p.text", fragments=fragments,
+    )
+
+def search_chunks(
+    db: Session, q: str, limit: int = 20, cursor: Optional[str] = None, fragments: int = 1
+) -> Tuple[list[dict], Optional[str]]:
+    return _fts_search(
+        db, "chunks_fts",
+        columns="c.id, c.page_id, c.chunk_index, c.start_char, c.end_char",
+        join="JOIN chunks c ON c.id = chunks_fts.rowid",
+        q=q, limit=limit, cursor=cursor, snippet_tokens=16,
+        text_column="c.text", fragments=fragments,
+    )
+
+
+# ---------- extraction jobs ----------
+
+_JOB_FIELDS = ("filename", "sha256", "status", "pages_total", "pages_done", "document_id", "error", "created_at")
+
+def save_job(db: Session, job, keep: int = 1000) -> None:
+    """
+    Upsert a jobs.Job's current state and commit. When it has finished, all
+    but the newest `keep` finished jobs are deleted.
+    """
+    db.merge(models.ExtractionJob(id=job.id, **{f: getattr(job, f) for f in _JOB_FIELDS}))
+    if job.finished:
+        db.execute(text(
+            "DELETE FROM extraction_jobs WHERE id IN (SELECT id FROM extraction_jobs "
+            "WHERE status IN ('done', 'failed') ORDER BY created_at DESC LIMIT -1 OFFSET :keep)"
+        ), {"keep": keep})
+    db.commit()
+
+def get_job(db: Session, job_id: str) -> Optional[models.ExtractionJob]:
+    return db.get(models.ExtractionJob, job_id)
+
+
+# ---------- async variants ----------
+# Same queries, awaitable: an AsyncSession runs them via run_sync on its
+# aiosqlite connection; a plain Session runs them in a worker thread.
+
+def _async_variant(fn: Callable) -> Callable:
+    @wraps(fn)
+    async def variant(db, *args, **kwargs):
+        if hasattr(db, "run_sync"):
+            return await db.run_sync(fn, *args, **kwargs)
+        return await asyncio.to_thread(fn, db, *args, **kwargs)
+    variant.__name__ = variant.__qualname__ = f"{fn.__name__}_async"
+    return variant
+
+get_document_by_hash_async = _async_variant(get_document_by_hash)
+get_job_async = _async_variant(get_job)
+documents_version_async = _async_variant(documents_version)
+upsert_document_with_pages_async = _async_variant(upsert_document_with_pages)
+list_documents_async = _async_variant(list_documents)
+get_document_detail_async = _async_variant(get_document_detail)
+list_pages_async = _async_variant(list_pages)
+list_chunks_async = _async_variant(list_chunks)
+search_pages_async = _async_variant(search_pages)
+search_chunks_async = _async_variant(search_chunks)
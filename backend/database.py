@@ -1,22 +1,91 @@
-from sqlalchemy import create_engine
+"""
+SQLite engines and sessions.
+
+Writes go through a single-connection engine (`engine`, `SessionLocal`), so
+concurrent ingests queue in the pool instead of contending for SQLite's write
+lock. A writer waits up to APP_DB_WRITE_TIMEOUT seconds (default 300) for the
+connection, long enough to queue behind a large bulk insert. Reads use a
+separate pooled engine whose connections are query_only; under WAL they never
+wait on a writer's commit.
+
+APP_DB_ASYNC=1 serves reads through SQLAlchemy asyncio + aiosqlite instead of
+threadpool sessions. The async engine is created on first use, so aiosqlite is
+only needed when the option is on.
+"""
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 import os
 
 DB_PATH = os.getenv("APP_DB_PATH", "app_data.db")
 DATABASE_URL = f"sqlite:///{DB_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+DB_ASYNC = os.getenv("APP_DB_ASYNC", "0") == "1"
+READ_POOL_SIZE = int(os.getenv("APP_DB_READ_POOL", "8"))
+WRITE_TIMEOUT = float(os.getenv("APP_DB_WRITE_TIMEOUT", "300"))
+READ_TIMEOUT = 30.0  # SQLAlchemy's default pool wait
+
+# Connection pragmas: WAL lets readers proceed during ingest commits, and
+# synchronous=NORMAL is durable under WAL while skipping an fsync per commit.
+# busy_timeout covers the rare checkpoint/lock contention instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": "MEMORY",
+}
+
+def _pragma_listener(read_only: bool):
+    def set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+    return set_pragmas
+
+def _sync_engine(read_only: bool, url: str = DATABASE_URL):
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False},  # SQLite threading
+        pool_pre_ping=True,
+        pool_size=READ_POOL_SIZE if read_only else 1,
+        max_overflow=0,
+        pool_timeout=READ_TIMEOUT if read_only else WRITE_TIMEOUT,
+    )
+    event.listen(eng, "connect", _pragma_listener(read_only))
+    return eng
+
+engine = _sync_engine(read_only=False)  # the single writer
+read_engine = _sync_engine(read_only=True)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # SQLite threading
-    pool_pre_ping=True,
-)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+_async_read_sessions = None
+
+def async_read_sessions():
+    """async_sessionmaker over a pooled, query_only aiosqlite engine (created on first call)."""
+    global _async_read_sessions
+    if _async_read_sessions is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        eng = create_async_engine(ASYNC_DATABASE_URL, pool_size=READ_POOL_SIZE, max_overflow=0)
+        event.listen(eng.sync_engine, "connect", _pragma_listener(read_only=True))
+        _async_read_sessions = async_sessionmaker(eng, autoflush=False, expire_on_commit=False)
+    return _async_read_sessions
 
 class Base(DeclarativeBase):
     pass
 
-def get_db():
-    db = SessionLocal()
+async def get_read_db():
+    """Read-only session for async endpoints: AsyncSession with APP_DB_ASYNC=1, else a sync Session."""
+    if DB_ASYNC:
+        async with async_read_sessions()() as db:
+            yield db
+        return
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
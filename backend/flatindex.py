@@ -0,0 +1,145 @@
+"""
+Flat, mmap-able serving snapshot of a built SimpleRetriever.
+
+Every uvicorn worker maps the same read-only file, so the TF-IDF postings,
+vocabulary and chunk texts live once in the OS page cache instead of once per
+worker heap. Layout:
+
+    MAGIC | u64 header length | JSON header | 64-byte aligned arrays...
+
+Arrays: CSC postings (data/indices/indptr), idf, the vocabulary as a sorted
+string table (offsets + UTF-8 blob, looked up by binary search), the columnar
+ChunkStore (integer columns + chunk text table), and optional dense embeddings.
+"""
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import json
+import os
+import struct
+
+import numpy as np
+import scipy.sparse as sp
+
+from .chunkstore import ChunkStore, StringTable
+
+MAGIC = b"QAFLAT01"
+ALIGN = 64
+
+
+def write_flat_index(
+    path: Path,
+    *,
+    header: dict,
+    tfidf: sp.csc_matrix,
+    idf: np.ndarray,
+    terms: List[str],
+    chunks: ChunkStore,
+    dense: Optional[np.ndarray] = None,
+):
+    """Write the snapshot atomically. `terms[j]` names column j of `tfidf`."""
+    # Sort the vocabulary (UTF-8 byte order == code point order) so lookups can bisect.
+    order = np.array(sorted(range(len(terms)), key=terms.__getitem__), dtype=np.int64)
+    tfidf = tfidf[:, order].tocsc()
+    tfidf.sort_indices()
+    index_dtype = np.int32 if tfidf.nnz < 2**31 else np.int64
+
+    arrays: Dict[str, np.ndarray] = {
+        "tfidf_data": tfidf.data.astype(np.float32),
+        "tfidf_indices": tfidf.indices.astype(index_dtype),
+        "tfidf_indptr": tfidf.indptr.astype(index_dtype),
+        "idf": np.asarray(idf, dtype=np.float64)[order],
+    }
+    vocab = StringTable.from_strings([terms[j] for j in order])
+    arrays["term_offsets"], arrays["term_blob"] = vocab.offsets, vocab.blob
+    for name, arr in chunks.to_arrays().items():
+        arrays[f"chunk_{name}"] = arr
+    if dense is not None:
+        arrays["dense"] = np.ascontiguousarray(dense, dtype=np.float32)
+
+    header = {
+        **header,
+        "n_chunks": len(chunks),
+        "n_terms": len(terms),
+        "shape": list(tfidf.shape),
+        "sources": chunks.sources,
+        "names": chunks.names,
+        "schemas": chunks.schemas,
+        "arrays": {},
+    }
+    # Header size depends on the offsets it records, so lay arrays out relative
+    # to a data section that starts at an aligned position after the header.
+    rel = 0
+    for name, arr in arrays.items():
+        header["arrays"][name] = [rel, arr.dtype.str, list(arr.shape)]
+        rel += -(-arr.nbytes // ALIGN) * ALIGN
+    header_bytes = json.dumps(header).encode("utf-8")
+    base = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGN) * ALIGN
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+        for name, arr in arrays.items():
+            f.seek(base + header["arrays"][name][0])
+            f.write(arr.tobytes())
+        f.truncate(base + rel)
+    os.replace(tmp, path)
+
+
+class FlatIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+        if mm[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"{path} is not a flat retriever index")
+        (hlen,) = struct.unpack("<Q", mm[len(MAGIC):len(MAGIC) + 8].tobytes())
+        start = len(MAGIC) + 8
+        self.header = json.loads(mm[start:start + hlen].tobytes().decode("utf-8"))
+        base = -(-(start + hlen) // ALIGN) * ALIGN
+
+        arrays = {}
+        for name, (rel, dtype, shape) in self.header["arrays"].items():
+            dt = np.dtype(dtype)
+            n = int(np.prod(shape)) if shape else 1
+            off = base + rel
+            arrays[name] = mm[off:off + n * dt.itemsize].view(dt).reshape(shape)
+        self._mm = mm
+
+        self.n_chunks = self.header["n_chunks"]
+        self.idf = arrays["idf"]
+        self.tfidf = sp.csc_matrix(
+            (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+            shape=tuple(self.header["shape"]),
+            copy=False,
+        )
+        self.terms = StringTable(arrays["term_offsets"], arrays["term_blob"])
+        self.chunks = ChunkStore.from_arrays(
+            {name[len("chunk_"):]: arr for name, arr in arrays.items() if name.startswith("chunk_")},
+            self.header["sources"],
+            self.header["schemas"],
+            self.header.get("names"),
+        )
+        self.dense: Optional[np.ndarray] = arrays.get("dense")
+
+    def transform(self, texts: Sequence[str], analyze: Callable[[str], List[str]]) -> sp.csr_matrix:
+        """TF-IDF + L2 norm of `texts`, same weighting as TfidfVectorizer.transform."""
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            cols, vals = [], []
+            for term, n in Counter(analyze(text)).items():
+                j = self.terms.find(term.encode("utf-8"))
+                if j >= 0:
+                    cols.append(j)
+                    vals.append(n * self.idf[j])
+            norm = float(np.sqrt(np.dot(vals, vals))) if vals else 0.0
+            order = np.argsort(cols)
+            indices.extend(np.asarray(cols, dtype=np.int64)[order])
+            data.extend((np.asarray(vals) / norm)[order] if norm else [])
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(len(texts), self.tfidf.shape[1]),
+        )
@@ -0,0 +1,80 @@
+"""
+SQLite FTS5 indexes over `pages.text` and `chunks.text`.
+
+The virtual tables are external-content tables (they store only the inverted
+index, not a second copy of the text) and are kept in sync with the ORM tables
+by AFTER INSERT/UPDATE/DELETE triggers, so every write path (ORM, bulk insert,
+raw SQL) stays consistent.
+"""
+from __future__ import annotations
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# (fts table, content table) pairs
+FTS_TABLES = (("pages_fts", "pages"), ("chunks_fts", "chunks"))
+
+# Sentinels wrapped around snippet matches; swapped for <mark> after escaping.
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+
+
+def _ddl(fts: str, content: str) -> list[str]:
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                text, content='{content}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {content} BEGIN
+                INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {content} BEGIN
+                INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text);
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF text ON {content} BEGIN
+                INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text);
+                INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text);
+            END""",
+    ]
+
+
+def ensure_fts(engine: Engine) -> None:
+    """Create FTS tables + triggers if missing; backfill them from existing rows."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        for fts, content in FTS_TABLES:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+                {"n": fts},
+            ).first()
+            for stmt in _ddl(fts, content):
+                conn.execute(text(stmt))
+            if not exists:
+                conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def to_match_query(q: str) -> str:
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+    - "quoted text"  -> phrase query
+    - term*          -> prefix query
+    - everything else is quoted, so FTS5 operators/punctuation can't break parsing.
+    Terms are ANDed (FTS5 default).
+    """
+    parts = []
+    for phrase, word in _TOKEN_RE.findall(q):
+        if phrase:
+            phrase = phrase.strip()
+            if phrase:
+                parts.append('"' + phrase.replace('"', '""') + '"')
+            continue
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', "")
+        if not word:
+            continue
+        parts.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(parts)
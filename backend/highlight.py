@@ -0,0 +1,168 @@
+"""
+Query-term highlighting for result snippets (/qa passages, /search fragments).
+
+One compiled alternation of the lowercased query terms is run over the
+lowercased text (much cheaper than an IGNORECASE scan). Window selection only
+looks at the first MAX_MATCHES matches, so the cost on long, match-heavy
+chunks is bounded. Only the chosen window(s) are HTML-escaped and wrapped in
+<mark>. Matches never overlap, so marks never nest, and long chunks are never
+escaped or copied whole.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Match, Optional, Pattern, Tuple, Union
+import html
+import re
+
+ELLIPSIS = "…"
+MAX_MATCHES = 24  # matches considered when choosing windows
+_OPEN, _CLOSE = "\x02", "\x03"  # sentinels; never produced or altered by html.escape
+_TERM_RE = re.compile(r"\w+\*?")
+
+
+@lru_cache(maxsize=1024)
+def query_pattern(query: str, min_len: int = 3, max_terms: int = 6,
+                  whole_words: bool = False) -> Optional[Pattern[str]]:
+    """
+    Regex matching the first `max_terms` distinct query words of at least
+    `min_len` characters; None if there are none. With `whole_words`, terms
+    match whole tokens only, and a trailing `*` marks a prefix term (FTS5 style).
+    Longer terms come first, so the alternation prefers them. The pattern is
+    case-sensitive and meant to run over lowercased text (see highlight()).
+    """
+    terms: List[str] = []
+    for raw in _TERM_RE.findall(query.lower()):
+        prefix = raw.endswith("*")
+        word = raw.rstrip("*")
+        if len(word) < min_len:
+            continue
+        if whole_words:
+            term = rf"\b{re.escape(word)}" + (r"\w*" if prefix else r"\b")
+        else:
+            term = re.escape(word)
+        if term not in terms:
+            terms.append(term)
+        if len(terms) == max_terms:
+            break
+    if not terms:
+        return None
+    terms.sort(key=len, reverse=True)
+    return re.compile("|".join(terms))
+
+
+def _prepare(text: str, pattern: Pattern[str]) -> Tuple[str, Pattern[str]]:
+    """The string to scan and the pattern to scan it with; offsets match `text`."""
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters change length when lowercased; offsets would drift.
+        return text, re.compile(pattern.pattern, re.IGNORECASE)
+    return lowered, pattern
+
+
+def _find(scanned: str, pattern: Pattern[str], start: int = 0, end: Optional[int] = None,
+          limit: Optional[int] = None) -> List[Match[str]]:
+    """Up to `limit` matches in scanned[start:end]."""
+    return list(islice(pattern.finditer(scanned, start, len(scanned) if end is None else end), limit))
+
+
+def _densest(spans: List[Tuple[int, int]], keys: List[str], width: int) -> Optional[Tuple[int, int]]:
+    """
+    (i, j) of the run spans[i..j] fitting in `width` chars with the most distinct
+    terms, then the most matches, then the earliest start. Sliding window, O(n).
+    """
+    best, best_score = None, None
+    seen: Dict[str, int] = {}
+    j = -1
+    for i in range(len(spans)):
+        while j + 1 < len(spans) and spans[j + 1][1] - spans[i][0] <= width:
+            j += 1
+            seen[keys[j]] = seen.get(keys[j], 0) + 1
+        if j >= i:
+            score = (len(seen), j - i + 1)
+            if best_score is None or score > best_score:
+                best, best_score = (i, j), score
+            seen[keys[i]] -= 1
+            if not seen[keys[i]]:
+                del seen[keys[i]]
+        else:
+            j = i  # a single match longer than the window: skip it
+    return best
+
+
+def _windows(text: str, matches: List[Tuple[int, int]], keys: List[str],
+             width: int, count: int) -> List[Tuple[int, int]]:
+    """Up to `count` non-overlapping windows of `width` chars, each around the densest cluster of matches."""
+    chosen: List[Tuple[int, int]] = []
+    free, free_keys = matches, keys
+    while free and len(chosen) < count:
+        found = _densest(free, free_keys, width)
+        if found is None:
+            break
+        i, j = found
+        first, last = free[i][0], free[j][1]
+        # Center the cluster in the window, then slide it back inside the text.
+        start = max(0, first - (width - (last - first)) // 2)
+        end = min(len(text), start + width)
+        start = max(0, end - width)
+        # Snap inward to word boundaries without cutting the cluster.
+        if start > 0:
+            k = text.find(" ", start, first)
+            start = k + 1 if k >= 0 else start
+        if end < len(text):
+            k = text.rfind(" ", last, end)
+            end = k if k >= 0 else end
+        chosen.append((start, end))
+        if len(chosen) == count:
+            break
+        keep = [n for n, m in enumerate(free) if m[1] <= start or m[0] >= end]
+        free, free_keys = [free[n] for n in keep], [free_keys[n] for n in keep]
+    return sorted(chosen)
+
+
+def _render(text: str, start: int, end: int, matches: List[Tuple[int, int]]) -> str:
+    spans = [(a, b) for a, b in matches if start <= a and b <= end]
+    window = text[start:end]
+    if _OPEN in window or _CLOSE in window:
+        # Sentinels occur in the text itself: escape gap by gap instead.
+        parts, pos = [], start
+        for a, b in spans:
+            parts.append(f"{html.escape(text[pos:a])}<mark>{html.escape(text[a:b])}</mark>")
+            pos = b
+        parts.append(html.escape(text[pos:end]))
+        window = "".join(parts)
+    else:
+        # Bracket matches with sentinel characters, escape the window in one
+        # call, then turn the sentinels into tags: far cheaper than escaping
+        # every gap separately.
+        parts, pos = [], start
+        for a, b in spans:
+            parts.append(f"{text[pos:a]}{_OPEN}{text[a:b]}{_CLOSE}")
+            pos = b
+        parts.append(text[pos:end])
+        window = html.escape("".join(parts)).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+    return (ELLIPSIS if start > 0 else "") + window + (ELLIPSIS if end < len(text) else "")
+
+
+def highlight(text: str, query: Union[str, Pattern[str], None], max_chars: int = 420,
+              fragments: int = 1, separator: str = " ") -> str:
+    """
+    HTML-safe snippet of `text` (at most `max_chars` source characters, split
+    over up to `fragments` windows) with query terms wrapped in <mark>.
+    `query` is a question string or a pattern from query_pattern().
+    """
+    pattern = query_pattern(query) if isinstance(query, str) else query
+    if pattern is None:
+        return _render(text, 0, min(len(text), max_chars), [])
+    scanned, pattern = _prepare(text, pattern)
+    if len(text) <= max_chars:
+        return _render(text, 0, len(text), [m.span() for m in _find(scanned, pattern)])
+    found = _find(scanned, pattern, limit=MAX_MATCHES)
+    matches, keys = [m.span() for m in found], [m.group().lower() for m in found]
+    windows = _windows(text, matches, keys, max_chars // max(1, fragments), max(1, fragments))
+    if not windows:
+        return _render(text, 0, max_chars, [])
+    if len(found) < MAX_MATCHES:
+        return separator.join(_render(text, a, b, matches) for a, b in windows)
+    # Re-scan each window: it may hold matches past the MAX_MATCHES cutoff.
+    return separator.join(_render(text, a, b, [m.span() for m in _find(scanned, pattern, a, b)]) for a, b in windows)
@@ -0,0 +1,189 @@
+"""
+Background PDF extraction jobs.
+
+`/upload-pdf` queues a job and returns immediately; page ranges are extracted
+in a bounded process pool, so a large PDF spreads across cores and never
+blocks the event loop. A job runs in the API worker process that accepted
+the upload; its state is also recorded through `save` on every change (the
+app writes it to SQLite), so `/jobs/{id}` works from any worker.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+import asyncio
+import multiprocessing
+import os
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+
+from src.observability import span
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 2)))
+MAX_ACTIVE_JOBS = int(os.getenv("PDF_MAX_ACTIVE_JOBS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("PDF_MAX_PENDING_JOBS", "32"))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+JOB_HISTORY = int(os.getenv("PDF_JOB_HISTORY", "1000"))
+
+
+# ---------- process-pool entry points (must be top-level to pickle) ----------
+
+# Ingestion (pdfplumber) is imported in the pool workers, never in the API
+# process. Both go through the shared page cache, keyed by the upload's sha256.
+
+def count_pages(path: str, sha256: str) -> int:
+    from src.ingestion.pdf_loader import pdf_page_count
+    return pdf_page_count(path, sha256=sha256)
+
+def extract_page_range(path: str, start: int, stop: int, sha256: str) -> List[str]:
+    """Stripped text of pages [start, stop) (0-based)."""
+    from src.ingestion.pdf_loader import extract_pdf_pages
+    return [t.strip() for t in extract_pdf_pages(path, start, stop, sha256=sha256)]
+
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    sha256: str
+    status: str = "queued"  # queued | running | done | failed
+    pages_total: int = 0
+    pages_done: int = 0
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+# Persists extracted page texts and returns the new document id (runs in a thread).
+PersistFn = Callable[[Job, List[str]], int]
+# Records a job's current state where every API worker can read it (runs in a thread).
+SaveFn = Callable[[Job], None]
+
+
+class ExtractionJobs:
+    def __init__(
+        self,
+        workers: int = PDF_WORKERS,
+        max_active: int = MAX_ACTIVE_JOBS,
+        max_pending: int = MAX_PENDING_JOBS,
+        pages_per_task: int = PAGES_PER_TASK,
+        history: int = JOB_HISTORY,
+        save: Optional[SaveFn] = None,
+    ):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.pages_per_task = max(1, pages_per_task)
+        self.history = history
+        self._max_active = max(1, max_active)
+        self._save = save
+        self._active: Optional[asyncio.Semaphore] = None  # set by start()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: don't fork a process that holds threads and DB connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def start(self):
+        """Call at app startup: binds the concurrency limit to the running event loop."""
+        self._active = asyncio.Semaphore(self._max_active)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if not j.finished)
+
+    async def add_finished(self, filename: str, sha256: str, document_id: int) -> Job:
+        """Record an already-satisfied upload (e.g. duplicate hash) as a done job."""
+        job = Job(id=uuid.uuid4().hex, filename=filename, sha256=sha256,
+                  status="done", document_id=document_id)
+        self._remember(job)
+        await self._record(job)
+        return job
+
+    async def submit(self, path: str, filename: str, sha256: str, persist: PersistFn) -> Job:
+        """Queue extraction of the PDF at `path` (deleted when the job ends)."""
+        if self._active is None:
+            raise RuntimeError("ExtractionJobs.start() has not been called")
+        if self.pending() >= self.max_pending:
+            raise JobQueueFull(f"{self.max_pending} extraction jobs already pending")
+        job = Job(id=uuid.uuid4().hex, filename=filename, sha256=sha256)
+        self._remember(job)
+        await self._record(job)  # visible to other workers before the id is returned
+        task = asyncio.get_running_loop().create_task(self._run(job, path, persist))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _remember(self, job: Job):
+        self._jobs[job.id] = job
+        if len(self._jobs) > self.history:
+            for old_id in [k for k, j in self._jobs.items() if j.finished][: len(self._jobs) - self.history]:
+                del self._jobs[old_id]
+
+    async def _record(self, job: Job):
+        if self._save is None:
+            return
+        try:
+            await run_in_threadpool(self._save, job)
+        except Exception as e:  # progress reporting must not fail the job
+            print(f"[jobs] Could not record job {job.id}: {e}")
+
+    async def _run(self, job: Job, path: str, persist: PersistFn):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._active:
+                job.status = "running"
+                await self._record(job)
+                pool = self._pool()
+                # Wall time of the whole job's extraction, measured here since it runs in other processes.
+                with span("pdf_extract"):
+                    job.pages_total = await loop.run_in_executor(pool, count_pages, path, job.sha256)
+
+                    ranges = [(s, min(s + self.pages_per_task, job.pages_total))
+                              for s in range(0, job.pages_total, self.pages_per_task)]
+                    futures = [loop.run_in_executor(pool, extract_page_range, path, a, b, job.sha256) for a, b in ranges]
+                    for fut in asyncio.as_completed(futures):
+                        job.pages_done += len(await fut)
+                        await self._record(job)
+                    # gather keeps page order; all futures are already resolved here
+                    page_texts = [t for part in await asyncio.gather(*futures) for t in part]
+
+                job.document_id = await run_in_threadpool(persist, job, page_texts)
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status, job.error = "failed", "Cancelled at shutdown"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"Failed to read PDF: {e}"
+        finally:
+            await self._record(job)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from typing import Optional
 from sqlalchemy import Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base
@@ -16,7 +17,8 @@ class Document(Base):
     )
 
     pages: Mapped[list["Page"]] = relationship(
-        "Page", back_populates="document", cascade="all, delete-orphan"
+        "Page", back_populates="document", cascade="all, delete-orphan",
+        order_by="Page.page_number",
     )
 
 class Page(Base):
@@ -30,7 +32,8 @@ class Page(Base):
 
     document: Mapped["Document"] = relationship("Document", back_populates="pages")
     chunks: Mapped[list["Chunk"]] = relationship(
-        "Chunk", back_populates="page", cascade="all, delete-orphan"
+        "Chunk", back_populates="page", cascade="all, delete-orphan",
+        order_by="Chunk.chunk_index",
     )
 
     __table_args__ = (
@@ -52,3 +55,24 @@ class Chunk(Base):
     __table_args__ = (
         Index("ix_chunks_page_idx", "page_id", "chunk_index", unique=True),
     )
+
+class ExtractionJob(Base):
+    """Upload extraction job state, readable by every API worker (see backend/jobs.py)."""
+    __tablename__ = "extraction_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    filename: Mapped[str] = mapped_column(String(512), nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    pages_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    document_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    __table_args__ = (
+        Index("ix_extraction_jobs_status_created", "status", "created_at"),
+    )
@@ -1,22 +1,87 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Literal, Optional
 from pathlib import Path
-import html
+import os
+import secrets
+import threading
+import time
 
-from .retriever import SimpleRetriever
+from src.nlp.embeddings import get_embedder
+from src.nlp.rerank import get_reranker
+from src.observability import span
+from .batch import BATCH_SIZE, aiter_lines, answer_batch, parse_line, to_ndjson
+from .cache import QueryCache, normalize_query
+from .corpora import CorpusRegistry, parse_corpora
+from .highlight import highlight, query_pattern
 
 router = APIRouter(prefix="/qa", tags=["qa"])
 
 DATA_DIR = Path(__file__).resolve().parents[1] / "sample_data"
-_retriever = SimpleRetriever(DATA_DIR)
-num_chunks = _retriever.build()
-print(f"[qa] Retriever ready with {num_chunks} chunks from {DATA_DIR}")
+INDEX_DIR = Path(os.getenv("QA_INDEX_DIR", "qa_index"))
+EMBED_CACHE_DIR = Path(os.getenv("QA_EMBED_CACHE_DIR", "embedding_cache"))
+# e.g. QA_CORPORA="default=sample_data,legal=/data/legal"
+CORPORA = parse_corpora(os.getenv("QA_CORPORA", "")) or {"default": DATA_DIR}
+DEFAULT_CORPUS = next(iter(CORPORA))
+ADMIN_TOKEN = os.getenv("QA_ADMIN_TOKEN")
+# QA_DENSE=1 loads an embedder (EMBED_BACKEND) at startup and adds the dense
+# stage to mode="hybrid"; off by default, so startup never fetches a model.
+DENSE = os.getenv("QA_DENSE", "0") == "1"
+# QA_STARTUP=background serves requests (503 on /qa, /ready not ready) while
+# indexes load; "blocking" finishes loading before the app accepts traffic.
+STARTUP_MODE = os.getenv("QA_STARTUP", "background")
+if STARTUP_MODE not in ("background", "blocking"):
+    raise ValueError(f"QA_STARTUP must be 'background' or 'blocking', not {STARTUP_MODE!r}")
+_reranker = None  # set by startup()
+
+# Index builds: QA_BUILD_WORKERS processes (default: all cores), QA_RECURSIVE=1 walks
+# subdirectories, QA_FILE_TIMEOUT (seconds) skips files that take longer to parse.
+_file_timeout = float(os.getenv("QA_FILE_TIMEOUT", "0"))
+corpora = CorpusRegistry(
+    INDEX_DIR,
+    embedding_cache_dir=EMBED_CACHE_DIR,
+    retriever_options={
+        "workers": int(os.getenv("QA_BUILD_WORKERS", str(os.cpu_count() or 1))),
+        "recursive": os.getenv("QA_RECURSIVE", "0") == "1",
+        "file_timeout": _file_timeout or None,
+    },
+)
+for _name, _dir in CORPORA.items():
+    corpora.register(_name, _dir)
+
+
+def _load_corpora():
+    corpora.build_all()
+    corpora.watch(float(os.getenv("QA_WATCH_INTERVAL", "0")))
+
+def startup():
+    """
+    Load models and corpus indexes; called from the app's lifespan, so nothing
+    heavy happens at import time.
+    """
+    global _reranker
+    corpora.embedder = get_embedder() if DENSE else None
+    _reranker = get_reranker()
+    if STARTUP_MODE == "blocking":
+        _load_corpora()
+    else:
+        threading.Thread(target=_load_corpora, daemon=True, name="corpus-load").start()
+
+def shutdown():
+    corpora.stop()
 
 class QARequest(BaseModel):
     question: str = Field(..., min_length=2)
+    corpus: str = DEFAULT_CORPUS
     top_k: int = Field(3, ge=1, le=10)
+    # "lexical": TF-IDF cosine scores. "hybrid" (opt-in): RRF-fused ranks, so
+    # scores are not cosines; see SimpleRetriever.query_hybrid.
+    mode: Literal["hybrid", "lexical"] = "lexical"
+    candidates: int = Field(200, ge=1, le=1000)  # lexical-stage budget in hybrid mode
+    rerank: bool = True  # only applies when RERANK_MODEL is configured
 
 class QAPassage(BaseModel):
     doc_id: str
@@ -28,31 +93,158 @@ class QAPassage(BaseModel):
 class QAResponse(BaseModel):
     question: str
     answers: List[QAPassage]
+    mode: str = "lexical"
+    timings_ms: Dict[str, float] = {}
+    budgets: Dict[str, int] = {}
+    cached: bool = False
+
+# Keyed on the retriever's build stamp, so a corpus rebuild invalidates its entries.
+_cache = QueryCache("qa")
 
 @router.get("/ping")
 def ping():
-    return {"status": "ok", "chunks_indexed": num_chunks}
+    status = corpora.status()
+    return {
+        "status": "ok",
+        "chunks_indexed": sum(s["chunks"] for s in status.values()),
+        "corpora": {name: s["chunks"] for name, s in status.items()},
+    }
+
+@router.get("/corpora")
+def list_corpora():
+    return corpora.status()
 
-def _highlight(text: str, query: str, max_chars: int = 420) -> str:
-    safe = html.escape(text)
-    q_words = [w for w in query.lower().split() if len(w) > 2][:6]
-    for w in q_words:
-        safe = safe.replace(html.escape(w), f"<mark>{html.escape(w)}</mark>")
-        safe = safe.replace(html.escape(w.capitalize()), f"<mark>{html.escape(w.capitalize())}</mark>")
-    return safe if len(safe) <= max_chars else safe[:max_chars] + "…"
+@router.post("/corpora/{name}/rebuild", status_code=202)
+def rebuild_corpus(name: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Rebuild a corpus index in the background and swap it in when ready.
+    Requires X-Admin-Token; disabled (403) unless QA_ADMIN_TOKEN is set.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Rebuilds are disabled: QA_ADMIN_TOKEN is not set")
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if corpora.data_dir(name) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown corpus '{name}'")
+    started = corpora.rebuild_async(name)
+    return {"corpus": name, "started": started, "status": corpora.status()[name]}
+
+def _retriever(corpus: str):
+    if corpora.data_dir(corpus) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown corpus '{corpus}'")
+    retriever = corpora.get(corpus)
+    if retriever is None or not retriever.chunks:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Corpus '{corpus}' is empty or still building. Add files to "
+                   f"{corpora.data_dir(corpus)} and POST /qa/corpora/{corpus}/rebuild.",
+        )
+    return retriever
 
 @router.post("", response_model=QAResponse)
 def ask(payload: QARequest):
-    if num_chunks == 0:
-        raise HTTPException(status_code=503, detail="Corpus is empty. Put files in sample_data/ and restart.")
-    hits = _retriever.query(payload.question, top_k=payload.top_k)
+    # Take one reference: a concurrent rebuild swaps in a new retriever, not this one.
+    retriever = _retriever(payload.corpus)
+    t = time.perf_counter()
+    rerank = payload.rerank and _reranker is not None
+    key = (payload.corpus, retriever.version, normalize_query(payload.question),
+           payload.top_k, payload.mode, payload.candidates if payload.mode == "hybrid" else None, rerank)
+    cached = _cache.get(key)
+    if cached is not None:
+        answers, budgets = cached
+        return QAResponse(
+            question=payload.question,
+            answers=answers,
+            mode=payload.mode,
+            timings_ms={"cache": round((time.perf_counter() - t) * 1000, 3)},
+            budgets=budgets,
+            cached=True,
+        )
+
+    if payload.mode == "hybrid":
+        hits, stats = retriever.query_hybrid(
+            payload.question,
+            top_k=payload.top_k,
+            candidates=payload.candidates,
+            reranker=_reranker if payload.rerank else None,
+        )
+    else:
+        t = time.perf_counter()
+        hits = retriever.query(payload.question, top_k=payload.top_k)
+        stats = {"timings_ms": {"lexical": (time.perf_counter() - t) * 1000}, "budgets": {}}
+
+    t = time.perf_counter()
     answers = []
+    pattern = query_pattern(payload.question)  # compiled once for all passages
     for c, score in hits:
+        with span("highlight"):
+            highlighted = highlight(c.text, pattern)
         answers.append(QAPassage(
             doc_id=c.doc_id,
             source_path=c.source_path,
             score=round(score, 6),
             text=c.text,
-            highlighted=_highlight(c.text, payload.question),
+            highlighted=highlighted,
         ))
-    return QAResponse(question=payload.question, answers=answers)
+    stats["timings_ms"]["highlight"] = (time.perf_counter() - t) * 1000
+    size = sum(len(a.text) + len(a.highlighted or "") + len(a.doc_id) + len(a.source_path) + 200 for a in answers)
+    _cache.put(key, (answers, stats["budgets"]), size)
+    return QAResponse(
+        question=payload.question,
+        answers=answers,
+        mode=payload.mode,
+        timings_ms={k: round(v, 3) for k, v in stats["timings_ms"].items()},
+        budgets=stats["budgets"],
+    )
+
+class _BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for a body iterator that is itself reading the request.
+    Before ASGI 2.4 Starlette also listens for disconnects on `receive`, which
+    would swallow request body messages; here the reader sees the disconnect
+    instead (request.stream() raises ClientDisconnect).
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@router.post("/batch")
+async def ask_batch(
+    request: Request,
+    corpus: str = DEFAULT_CORPUS,
+    top_k: int = Query(3, ge=1, le=10),
+    mode: Literal["hybrid", "lexical"] = "lexical",
+    candidates: int = Query(200, ge=1, le=1000),
+    rerank: bool = False,
+    field: str = "question",
+    id_field: str = "id",
+    batch_size: int = Query(BATCH_SIZE, ge=1, le=4096),
+    with_text: bool = Query(False, alias="text"),
+    with_highlight: bool = Query(False, alias="highlight"),
+):
+    """
+    Answer an NDJSON body of questions (see backend/batch.py for the format) and
+    stream one NDJSON result per line, in order, as each batch completes. The
+    body is read incrementally, so at most one batch is in memory. Results are
+    not cached.
+    """
+    retriever = _retriever(corpus)
+    reranker = _reranker if rerank else None
+
+    async def results():
+        batch, line_no = [], 0
+        async for line in aiter_lines(request.stream()):
+            line_no += 1
+            record = parse_line(line, line_no, field, id_field)
+            if record is not None:
+                batch.append(record)
+            if len(batch) >= batch_size:
+                yield to_ndjson(await run_in_threadpool(
+                    answer_batch, retriever, batch, top_k, mode, candidates, reranker, with_text, with_highlight))
+                batch = []
+        if batch:
+            yield to_ndjson(await run_in_threadpool(
+                answer_batch, retriever, batch, top_k, mode, candidates, reranker, with_text, with_highlight))
+
+    return _BodyStreamingResponse(results(), media_type="application/x-ndjson")
@@ -1,110 +1,796 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Tuple
-import re
+from typing import Callable, Dict, List, Optional, Tuple
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
 
-import pdfplumber
-import pandas as pd
+import numpy as np
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
+from src.nlp.embeddings import EmbeddingCache, VectorIndex
+from src.nlp.tokenization import Chunker, default_chunker
+from src.observability import span
+from .chunkstore import CSV, PDF, TXT, ChunkStore, DocChunk
+from .flatindex import FlatIndex, write_flat_index
 
-@dataclass
-class DocChunk:
-    doc_id: str
-    source_path: str
-    text: str
-    meta: dict
+
+INDEX_FORMAT_VERSION = 2
+# Stamps each completed build; caches key results on it so a rebuild invalidates them.
+_BUILD_IDS = itertools.count(1)
+
+
+def _sha256_file(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@contextmanager
+def _time_limit(seconds: Optional[float]):
+    """
+    Raise TimeoutError in the block after `seconds` (SIGALRM; main thread of a
+    POSIX process only, otherwise no limit). Parsers are pure Python, so the
+    signal interrupts them.
+    """
+    if not seconds or not hasattr(signal, "setitimer") or \
+            threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise TimeoutError(f"timed out after {seconds:g}s")
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# ---------- process-pool entry points (must be top-level to pickle) ----------
+
+def _pdf_page_count(path: str, timeout: Optional[float], sha256: Optional[str] = None) -> int:
+    from src.ingestion.pdf_loader import pdf_page_count
+    with _time_limit(timeout):
+        return pdf_page_count(path, sha256=sha256)
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+def _load_in_worker(path: str, options: dict, timeout: Optional[float],
+                    pages: Optional[Tuple[int, int]] = None, sha256: Optional[str] = None,
+                    loader_cls: Optional[type] = None) -> ChunkStore:
+    """Parse one file (or a PDF page range) into a fresh ChunkStore."""
+    loader = (loader_cls or SimpleRetriever)(**options)
+    store = ChunkStore()
+    with _time_limit(timeout):
+        if pages is not None:
+            loader._load_pdf(Path(path), store, pages, sha256)
+        else:
+            loader._load_file(Path(path), store, sha256)
+    return store
+
+
+class _Task:
+    """One call submitted to a _LoadPool; `future` is replaced if the pool is rebuilt."""
+    __slots__ = ("fn", "args", "future", "started", "error")
+
+    def __init__(self, fn, args):
+        self.fn, self.args = fn, args
+        self.future: Optional[Future] = None
+        self.started: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+
+class _LoadPool:
+    """
+    Spawned process pool for parsing, with a per-task deadline. Workers arm
+    SIGALRM themselves (they run tasks on their main thread), which interrupts
+    pure-Python parsers after `timeout`. A task still running 2 x timeout + 1s
+    after the pool started it is stuck outside Python code: its processes are
+    killed, the stuck task fails with TimeoutError and every other unfinished
+    task is resubmitted to a fresh pool.
+    """
+
+    _POLL = 0.05
+
+    def __init__(self, workers: int, timeout: Optional[float]):
+        self.workers = workers
+        self.timeout = timeout
+        self._tasks: List[_Task] = []
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: builds also run in background threads of the API process
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        if self.timeout:
+            # Start every worker (and its imports) before any deadline runs.
+            for fut in [pool.submit(_worker_ready) for _ in range(self.workers)]:
+                fut.result()
+        return pool
+
+    def submit(self, fn, *args) -> _Task:
+        task = _Task(fn, args)
+        task.future = self._pool.submit(fn, *args)
+        self._tasks.append(task)
+        return task
+
+    def result(self, task: _Task):
+        if not self.timeout:
+            return task.future.result()
+        while True:
+            if task.error is not None:
+                raise task.error
+            future = task.future
+            try:
+                return future.result(timeout=self._POLL)
+            except FutureTimeout:  # the builtin TimeoutError since 3.11
+                if future.done():
+                    raise  # raised by the task itself (its own alarm)
+            self._check_stuck()
+
+    def _check_stuck(self):
+        now, limit = time.monotonic(), 2 * self.timeout + 1
+        stuck = []
+        for t in self._tasks:
+            if t.error is None and t.future.running():
+                if t.started is None:
+                    t.started = now
+                elif now - t.started > limit:
+                    stuck.append(t)
+        if stuck:
+            self._restart(stuck)
+
+    def _restart(self, stuck: List[_Task]):
+        unfinished = [t for t in self._tasks if t.error is None and not t.future.done() and t not in stuck]
+        self._kill()
+        for t in stuck:
+            t.error = TimeoutError(f"timed out after {self.timeout:g}s (worker killed)")
+        self._pool = self._new_pool()
+        for t in unfinished:
+            t.future, t.started = self._pool.submit(t.fn, *t.args), None
+
+    def _kill(self):
+        for proc in list((getattr(self._pool, "_processes", None) or {}).values()):
+            proc.kill()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        # Not awaited: a task still running is bounded by its own alarm.
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+ProgressFn = Callable[[int, int, str], None]  # (files done, files to parse, path)
 
 
 class SimpleRetriever:
     """
     In-memory retriever over local files.
-    - Indexes TXT (paragraphs), PDF (page paragraphs), CSV (rows).
+    - Indexes TXT and PDF pages as Chunker chunks (token-bounded, packed at
+      paragraph/sentence boundaries; the same chunker as DB ingestion), CSV rows.
     - Uses TF-IDF + cosine similarity.
+    - If `index_path` is set, the parsed chunks and raw term counts are persisted
+      there, keyed by each file's path + mtime + sha256. A later `build()` only
+      re-parses new or changed files and patches their rows into the matrix.
+    - If an `embedder` is given, chunks are also embedded (through an on-disk
+      EmbeddingCache when `embedding_cache_dir` is set) into a dense VectorIndex.
+    - With `index_path`, every build also writes a flat snapshot next to it
+      (`.flat`) and serves from an mmap of it; workers whose files are unchanged
+      map that snapshot directly and share it through the OS page cache.
+    - With `workers` > 1, files to (re)parse are loaded in a process pool, PDFs
+      split into page ranges; results are merged in discovery order, so doc_ids
+      and the index are identical to a serial build. `file_timeout` bounds the
+      time spent on any one file (or PDF page range); failures are reported in
+      `build_stats["errors"]` and the file is retried on the next build. With a
+      `file_timeout`, files are always parsed in worker processes (even with
+      one worker or one file): the alarm that enforces it only works on a
+      process's main thread, and builds usually run in background threads.
     """
 
-    def __init__(self, data_dir: Path):
+    def __init__(
+        self,
+        data_dir: Path,
+        index_path: Optional[Path] = None,
+        embedder=None,
+        embedding_cache_dir: Optional[Path] = None,
+        csv_columns: Optional[List[str]] = None,
+        csv_rows_per_chunk: int = 1,
+        csv_max_rows: Optional[int] = None,
+        csv_chunksize: int = 50_000,
+        recursive: bool = False,
+        workers: int = 1,
+        file_timeout: Optional[float] = None,
+        pdf_pages_per_task: int = 16,
+        chunker: Optional[Chunker] = None,
+    ):
         self.data_dir = data_dir
+        self.index_path = index_path
+        self.embedder = embedder
+        self.embedding_cache_dir = embedding_cache_dir
+        self.dense: Optional[VectorIndex] = None
+        # CSV ingestion: optional column subset, rows grouped per chunk, row cap,
+        # and the streaming read size (rounded to a multiple of the group size).
+        self.csv_columns = csv_columns
+        self.csv_rows_per_chunk = max(1, csv_rows_per_chunk)
+        self.csv_max_rows = csv_max_rows
+        self.csv_chunksize = csv_chunksize
+        self.recursive = recursive
+        self.chunker = chunker or default_chunker()
+        self.workers = max(1, workers)
+        self.file_timeout = file_timeout
+        self.pdf_pages_per_task = max(1, pdf_pages_per_task)
         self.vectorizer = TfidfVectorizer(
             stop_words="english",
             max_df=0.9,
             min_df=1,
             ngram_range=(1, 2),
         )
-        self.chunks: List[DocChunk] = []
-        self._tfidf = None
-
-    @staticmethod
-    def _split_paragraphs(text: str, min_len: int = 40) -> List[str]:
-        parts = re.split(r"\n\s*\n|(?<=\.)\s{2,}", text)
-        parts = [p.strip() for p in parts if p.strip()]
-        return [p for p in parts if len(p) >= min_len]
+        # Columnar storage; indexing yields DocChunk views.
+        self.chunks: ChunkStore = ChunkStore()
+        # L2-normalized TF-IDF, stored column-major (CSC): column j is the
+        # postings list of term j, so scoring only touches the query's terms.
+        self._tfidf: Optional[sp.csc_matrix] = None
+        # Raw term counts over a vocabulary that only grows between builds,
+        # so rows of unchanged files can be reused as-is.
+        self._terms: List[str] = []
+        self._counts: Optional[sp.csr_matrix] = None
+        self._files: Dict[str, dict] = {}
+        self._flat: Optional[FlatIndex] = None
+        self._analyze = None
+        self.build_stats: dict = {}
+        self.version = 0  # set by build(); 0 = never built
 
-    def _load_txt(self, path: Path):
+    def _load_txt(self, path: Path, store: ChunkStore):
         txt = path.read_text(encoding="utf-8", errors="ignore")
-        paras = self._split_paragraphs(txt) or [txt.strip()]
-        for i, para in enumerate(paras):
-            if not para: continue
-            self.chunks.append(DocChunk(
-                doc_id=f"{path.name}#c{i}",
-                source_path=str(path),
-                text=para,
-                meta={"type": "txt", "chunk_index": i},
-            ))
-
-    def _load_pdf(self, path: Path):
-        with pdfplumber.open(path) as pdf:
-            for p_i, page in enumerate(pdf.pages):
-                page_text = page.extract_text() or ""
-                paras = self._split_paragraphs(page_text) or [page_text.strip()]
-                for c_i, para in enumerate(paras):
-                    if not para: continue
-                    self.chunks.append(DocChunk(
-                        doc_id=f"{path.name}#p{p_i}c{c_i}",
-                        source_path=str(path),
-                        text=para,
-                        meta={"type": "pdf", "page": p_i},
-                    ))
-
-    def _load_csv(self, path: Path, max_rows: int = 2000):
-        df = pd.read_csv(path, nrows=max_rows)
-        for i, row in df.iterrows():
-            row_text = " | ".join(f"{col}: {row[col]}" for col in df.columns)
-            self.chunks.append(DocChunk(
-                doc_id=f"{path.name}#r{i}",
-                source_path=str(path),
-                text=str(row_text),
-                meta={"type": "csv", "row_index": i, "columns": list(df.columns)},
-            ))
-
-    def build(self) -> int:
-        paths = []
-        if self.data_dir.exists():
-            paths = list(self.data_dir.glob("*.txt")) + \
-                    list(self.data_dir.glob("*.pdf")) + \
-                    list(self.data_dir.glob("*.csv"))
+        sid = store.add_source(str(path), self._source_name(path))
+        for i, chunk in enumerate(self.chunker.chunks(txt)):
+            store.append(sid, TXT, i, chunk.text)
+
+    def _load_pdf(self, path: Path, store: ChunkStore, pages: Optional[Tuple[int, int]] = None,
+                  sha256: Optional[str] = None):
+        # Through the shared page cache: pages parsed by an upload (or an
+        # earlier build) are not parsed again. pdfplumber loads only on a miss.
+        from src.ingestion.pdf_loader import extract_pdf_pages
+        sid = store.add_source(str(path), self._source_name(path))
+        start, stop = pages or (0, None)
+        page_texts = extract_pdf_pages(str(path), start, stop, sha256=sha256)
+        for chunk in self.chunker.iter_pages(page_texts, first_page=start):
+            store.append(sid, PDF, chunk.index, chunk.text, page=chunk.page)
+
+    def _load_csv(self, path: Path, store: ChunkStore):
+        from src.ingestion.csv_loader import iter_csv, row_texts  # pandas
+        sid = store.add_source(str(path), self._source_name(path))
+        schema = None
+        group = self.csv_rows_per_chunk
+        chunksize = -(-self.csv_chunksize // group) * group
+        for df in iter_csv(path, chunksize=chunksize, usecols=self.csv_columns, nrows=self.csv_max_rows):
+            if schema is None:
+                schema = store.add_schema(df.columns)  # stored once per file, not per row
+            texts = row_texts(df).tolist()
+            rows = df.index.to_numpy()
+            if group > 1:
+                texts = ["\n".join(texts[i:i + group]) for i in range(0, len(texts), group)]
+                rows = rows[::group]
+            store.extend(sid, CSV, rows, texts, schema_id=schema)
 
+    def _load_file(self, path: Path, store: ChunkStore, sha256: Optional[str] = None):
+        suffix = path.suffix.lower()
+        if suffix == ".txt":
+            self._load_txt(path, store)
+        elif suffix == ".pdf":
+            self._load_pdf(path, store, sha256=sha256)
+        elif suffix == ".csv":
+            self._load_csv(path, store)
+
+    def _source_name(self, path: Path) -> str:
+        """Name used in doc_ids: the path relative to data_dir (the basename for top-level files)."""
+        try:
+            return path.relative_to(self.data_dir).as_posix()
+        except ValueError:
+            return path.name
+
+    def discover(self) -> List[Path]:
+        if not self.data_dir.exists():
+            return []
+        glob = self.data_dir.rglob if self.recursive else self.data_dir.glob
+        return sorted(p for p in glob("*.txt") if p.is_file()) + \
+               sorted(p for p in glob("*.pdf") if p.is_file()) + \
+               sorted(p for p in glob("*.csv") if p.is_file())
+
+    # ---------- parallel loading ----------
+
+    def _loader_options(self) -> dict:
+        """Constructor arguments a worker needs to parse files exactly like this retriever."""
+        return {
+            "data_dir": self.data_dir,
+            "csv_columns": self.csv_columns,
+            "csv_rows_per_chunk": self.csv_rows_per_chunk,
+            "csv_max_rows": self.csv_max_rows,
+            "csv_chunksize": self.csv_chunksize,
+            "chunker": self.chunker,
+        }
+
+    def _submit_loads(self, pool: _LoadPool, paths: List[Path],
+                      hashes: Dict[str, str]) -> Dict[str, List[_Task]]:
+        """Queue every file; PDFs are counted first, then fanned out as page ranges."""
+        # Workers parse with this class, so subclasses' loaders apply there too.
+        options, timeout, cls = self._loader_options(), self.file_timeout, type(self)
+        tasks: Dict[str, List[_Task]] = {}
+        counts: Dict[str, _Task] = {}
         for path in paths:
+            if path.suffix.lower() == ".pdf":
+                counts[str(path)] = pool.submit(_pdf_page_count, str(path), timeout, hashes.get(str(path)))
+            else:
+                tasks[str(path)] = [pool.submit(_load_in_worker, str(path), options, timeout, None, None, cls)]
+        step = self.pdf_pages_per_task
+        for key, task in counts.items():
             try:
-                if path.suffix.lower() == ".txt":
-                    self._load_txt(path)
-                elif path.suffix.lower() == ".pdf":
-                    self._load_pdf(path)
-                elif path.suffix.lower() == ".csv":
-                    self._load_csv(path)
-            except Exception as ex:
-                print(f"[retriever] Skipping {path.name}: {ex}")
-
-        corpus = [c.text for c in self.chunks] or ["(empty corpus)"]
-        self._tfidf = self.vectorizer.fit_transform(corpus)
+                n_pages = pool.result(task)
+            except Exception:
+                tasks[key] = [task]  # re-raised when the file is merged
+                continue
+            tasks[key] = [
+                pool.submit(_load_in_worker, key, options, timeout, (a, min(a + step, n_pages)), hashes.get(key), cls)
+                for a in range(0, n_pages, step)
+            ]
+        return tasks
+
+    # ---------- term counting / weighting ----------
+
+    def _index_params(self) -> dict:
+        """Settings that change chunk texts or term counts; a mismatch invalidates persisted data."""
+        return {
+            "stop_words": self.vectorizer.stop_words,
+            "ngram_range": list(self.vectorizer.ngram_range),
+            "lowercase": self.vectorizer.lowercase,
+            "csv": [self.csv_columns, self.csv_rows_per_chunk, self.csv_max_rows],
+            "chunking": self.chunker.params(),
+        }
+
+    def _count_rows(self, texts: List[str], term_index: Dict[str, int], terms: List[str]) -> sp.csr_matrix:
+        """Raw term counts for `texts`, appending unseen terms to the vocabulary."""
+        analyze = self.vectorizer.build_analyzer()
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            for term, n in Counter(analyze(text)).items():
+                j = term_index.get(term)
+                if j is None:
+                    j = term_index[term] = len(terms)
+                    terms.append(term)
+                indices.append(j)
+                data.append(n)
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.asarray(data, dtype=np.int32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(texts), len(terms)),
+        )
+
+    def _compact_terms(self):
+        """Drop vocabulary entries no longer used by any row (e.g. from removed files)."""
+        df = np.bincount(self._counts.indices, minlength=len(self._terms))
+        used = np.flatnonzero(df)
+        if used.size == len(self._terms):
+            return
+        remap = np.full(len(self._terms), -1, dtype=np.int32)
+        remap[used] = np.arange(used.size, dtype=np.int32)
+        self._counts = sp.csr_matrix(
+            (self._counts.data, remap[self._counts.indices], self._counts.indptr),
+            shape=(self._counts.shape[0], used.size),
+        )
+        self._terms = [self._terms[j] for j in used]
+
+    def _fit_weights(self):
+        """
+        Derive IDF and the L2-normalized TF-IDF matrix from the raw counts,
+        matching TfidfVectorizer(smooth_idf=True, norm="l2") incl. max_df pruning.
+        """
+        n_docs = self._counts.shape[0]
+        df = np.bincount(self._counts.indices, minlength=len(self._terms))
+        max_df = self.vectorizer.max_df
+        max_doc_count = max_df if isinstance(max_df, int) else max_df * n_docs
+        keep = np.flatnonzero((df >= 1) & (df <= max_doc_count))
+        if keep.size == 0:
+            keep = np.flatnonzero(df)
+        idf = np.log((1 + n_docs) / (1 + df[keep])) + 1.0
+
+        self.vectorizer.vocabulary_ = {self._terms[j]: i for i, j in enumerate(keep)}
+        self.vectorizer.idf_ = idf
+        tf = self._counts[:, keep].astype(np.float64)
+        self._tfidf = normalize(tf @ sp.diags(idf), norm="l2", copy=False).tocsc()
+
+    # ---------- persistence ----------
+
+    def _read_index(self) -> Optional[dict]:
+        if not self.index_path or not Path(self.index_path).exists():
+            return None
+        try:
+            with np.load(self.index_path, allow_pickle=False) as z:
+                manifest = json.loads(bytes(z["manifest"]).decode("utf-8"))
+                if manifest.get("version") != INDEX_FORMAT_VERSION or \
+                        manifest.get("analyzer") != self._index_params():
+                    return None
+                chunks = ChunkStore.from_arrays(
+                    {k[len("chunk_"):]: z[k] for k in z.files if k.startswith("chunk_")},
+                    manifest["sources"],
+                    manifest["schemas"],
+                    manifest.get("names"),
+                )
+                counts = sp.csr_matrix(
+                    (z["data"], z["indices"], z["indptr"]),
+                    shape=(len(chunks), len(manifest["terms"])),
+                )
+        except Exception as ex:
+            print(f"[retriever] Ignoring unreadable index {self.index_path}: {ex}")
+            return None
+        manifest["counts"] = counts
+        manifest["chunks"] = chunks
+        return manifest
+
+    def _write_index(self):
+        path = Path(self.index_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "version": INDEX_FORMAT_VERSION,
+            "analyzer": self._index_params(),
+            "files": self._files,
+            "terms": self._terms,
+            "sources": self.chunks.sources,
+            "names": self.chunks.names,
+            "schemas": self.chunks.schemas,
+        }
+        blob = np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8)
+        # Write-then-rename so concurrent workers never see a partial file.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                manifest=blob,
+                data=self._counts.data,
+                indices=self._counts.indices,
+                indptr=self._counts.indptr,
+                **{f"chunk_{k}": v for k, v in self.chunks.to_arrays().items()},
+            )
+        os.replace(tmp, path)
+
+    # ---------- mmap serving snapshot ----------
+
+    @property
+    def snapshot_path(self) -> Optional[Path]:
+        return Path(self.index_path).with_suffix(".flat") if self.index_path else None
+
+    def _snapshot_header(self) -> dict:
+        return {
+            "version": INDEX_FORMAT_VERSION,
+            "analyzer": self._index_params(),
+            "max_df": self.vectorizer.max_df,
+            "embedder": getattr(self.embedder, "name", None),
+        }
+
+    def _write_snapshot(self):
+        vocab = self.vectorizer.vocabulary_
+        terms = [""] * len(vocab)
+        for term, j in vocab.items():
+            terms[j] = term
+        write_flat_index(
+            self.snapshot_path,
+            header={
+                **self._snapshot_header(),
+                "files": {k: [f["mtime_ns"], f["size"]] for k, f in self._files.items()},
+            },
+            tfidf=self._tfidf,
+            idf=self.vectorizer.idf_,
+            terms=terms,
+            chunks=self.chunks,
+            dense=self.dense.vectors if self.dense is not None else None,
+        )
+
+    def _attach(self, flat: FlatIndex):
+        self._flat = flat
+        self.chunks = flat.chunks
+        self._tfidf = flat.tfidf
+        if self.embedder is not None and flat.dense is not None:
+            self.dense = VectorIndex(flat.dense)
+        # Build-only state; the next build() re-reads it from index_path.
+        self._counts = None
+        self._terms = []
+
+    def _try_attach(self) -> bool:
+        """Map an existing snapshot if it matches the current files (no parsing, no JSON decoding)."""
+        path = self.snapshot_path
+        if not path or not path.exists():
+            return False
+        try:
+            flat = FlatIndex(path)
+        except Exception as ex:
+            print(f"[retriever] Ignoring unreadable snapshot {path}: {ex}")
+            return False
+        header = flat.header
+        if any(header.get(k) != v for k, v in self._snapshot_header().items()):
+            return False
+        current = {}
+        for p in self.discover():
+            st = p.stat()
+            current[str(p)] = [st.st_mtime_ns, st.st_size]
+        if current != header["files"]:
+            return False
+        self._attach(flat)
+        self._files = {k: {"mtime_ns": m, "size": n} for k, (m, n) in current.items()}
+        return True
+
+    def _transform(self, texts: List[str]) -> sp.csr_matrix:
+        with span("tfidf_transform"):
+            if self._flat is not None:
+                if self._analyze is None:
+                    self._analyze = self.vectorizer.build_analyzer()
+                return self._flat.transform(texts, self._analyze)
+            return self.vectorizer.transform(texts)
+
+    # ---------- build / query ----------
+
+    def build(self, progress: Optional[ProgressFn] = None) -> int:
+        """
+        Index data_dir and return the chunk count. `progress(done, total, path)`
+        is called after each file that had to be parsed (or failed to).
+        """
+        if self._try_attach():
+            n_files = len(self._files)
+            self.build_stats = {"files": n_files, "reparsed": 0, "reused": n_files, "removed": 0,
+                                "errors": []}
+            self.version = next(_BUILD_IDS)
+            return len(self.chunks)
+
+        previous = self._read_index()
+        prev_files = previous["files"] if previous else {}
+        terms: List[str] = list(previous["terms"]) if previous else []
+        term_index = {t: i for i, t in enumerate(terms)}
+
+        prev_chunks: Optional[ChunkStore] = previous["chunks"] if previous else None
+        chunks = ChunkStore()
+        blocks: List[sp.csr_matrix] = []
+        files: Dict[str, dict] = {}
+        reparsed = 0
+
+        plan = []
+        for path in self.discover():
+            key = str(path)
+            st = path.stat()
+            prev = prev_files.get(key)
+            entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": None}
+            reuse = False
+            if prev and (prev["mtime_ns"], prev["size"]) == (entry["mtime_ns"], entry["size"]):
+                entry["sha256"] = prev["sha256"]
+                reuse = True
+            else:
+                entry["sha256"] = _sha256_file(path)
+                reuse = bool(prev) and prev["sha256"] == entry["sha256"]
+            plan.append((path, entry, prev, reuse))
+
+        to_parse = [path for path, _, _, reuse in plan if not reuse]
+        pool: Optional[_LoadPool] = None
+        loads: Dict[str, List[_Task]] = {}
+        if to_parse and (self.file_timeout or (self.workers > 1 and len(to_parse) > 1)):
+            pool = _LoadPool(min(self.workers, len(to_parse)), self.file_timeout)
+            loads = self._submit_loads(pool, to_parse, {str(p): e["sha256"] for p, e, _, _ in plan})
+
+        errors: List[dict] = []
+        done = 0
+        try:
+            for path, entry, prev, reuse in plan:
+                key = str(path)
+                start = len(chunks)
+                if reuse:
+                    chunks.extend_from(prev_chunks, prev["start"], prev["stop"])
+                    rows = previous["counts"][prev["start"]:prev["stop"]]
+                else:
+                    done += 1
+                    try:
+                        if pool is not None:
+                            # Merge in discovery order (not completion order) so doc_ids are stable.
+                            for task in loads[key]:
+                                part = pool.result(task)
+                                chunks.extend_from(part, 0, len(part))
+                        else:
+                            self._load_file(path, chunks, entry["sha256"])
+                    except Exception as ex:
+                        chunks.truncate(start)
+                        errors.append({"path": key, "error": f"{type(ex).__name__}: {ex}"})
+                        continue
+                    finally:
+                        if progress is not None:
+                            progress(done, len(to_parse), key)
+                    rows = self._count_rows(chunks.texts[start:], term_index, terms)
+                    reparsed += 1
+
+                entry["start"], entry["stop"] = start, len(chunks)
+                files[key] = entry
+                blocks.append(rows)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for b in blocks:
+            b.resize((b.shape[0], len(terms)))
+        self.chunks = chunks
+        self._terms = terms
+        self._counts = sp.vstack(blocks, format="csr") if blocks else sp.csr_matrix((0, len(terms)), dtype=np.int32)
+        self._files = files
+        self._compact_terms()
+
+        if self.chunks:
+            self._fit_weights()
+        else:
+            self._tfidf = None
+        if self.embedder is not None:
+            self.dense = VectorIndex(self._embed(list(self.chunks.texts)))
+
+        if self.index_path and (previous is None or reparsed or files != prev_files):
+            self._write_index()
+        if self.snapshot_path and self._tfidf is not None:
+            self._write_snapshot()
+            self._attach(FlatIndex(self.snapshot_path))
+
+        self.build_stats = {
+            "files": len(files),
+            "reparsed": reparsed,
+            "reused": len(files) - reparsed,
+            "removed": len(set(prev_files) - set(files)),
+            "errors": errors,
+        }
+        self.version = next(_BUILD_IDS)
         return len(self.chunks)
 
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if self.embedding_cache_dir:
+            return EmbeddingCache(self.embedding_cache_dir, self.embedder).embed(texts)
+        return self.embedder.encode(texts)
+
+    def _score(self, terms: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine scores for one L2-normalized query vector given as (term ids, weights).
+        Rows and query are unit length, so cosine == dot product; accumulating the
+        query terms' postings yields scores only for chunks sharing a term.
+        Returns (chunk indices, scores).
+        """
+        indptr, indices, data = self._tfidf.indptr, self._tfidf.indices, self._tfidf.data
+        with span("similarity_scoring"):
+            spans = [(indptr[j], indptr[j + 1], w) for j, w in zip(terms, weights) if indptr[j + 1] > indptr[j]]
+            if not spans:
+                return np.empty(0, dtype=np.int64), np.empty(0)
+            rows = np.concatenate([indices[a:b] for a, b, _ in spans])
+            contrib = np.concatenate([data[a:b] * w for a, b, w in spans])
+            cand, inverse = np.unique(rows, return_inverse=True)
+            return cand, np.bincount(inverse, weights=contrib)
+
+    @staticmethod
+    def _top_k(cand: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best k by score (ties broken by chunk order) via argpartition, not a full sort."""
+        if scores.size > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            cand, scores = cand[part], scores[part]
+        order = np.lexsort((cand, -scores))
+        return cand[order], scores[order]
+
+    def query_many(self, questions: List[str], top_k: int = 3) -> List[List[Tuple[DocChunk, float]]]:
+        """
+        Vectorize all questions in one transform call and score them with one
+        sparse product against the index (row i holds question i's nonzero
+        cosine scores). The product allocates O(chunks) scratch once per call,
+        so it pays off for batches; query() scores a single question through
+        the postings directly. Keep batches moderate: the result holds every
+        (question, matching chunk) pair.
+        """
+        if not questions:
+            return []
+        if not self.chunks or self._tfidf is None:
+            return [[] for _ in questions]
+        q_mat = self._transform(questions)
+        k = max(1, top_k)
+        with span("similarity_scoring"):
+            # _tfidf is CSC (chunks x terms), so .T is a free CSR (terms x chunks) view.
+            scores = (q_mat @ self._tfidf.T).tocsr()
+        results = []
+        for i in range(scores.shape[0]):
+            a, b = scores.indptr[i], scores.indptr[i + 1]
+            idxs, best = self._top_k(scores.indices[a:b], scores.data[a:b], k)
+            results.append([(self.chunks[j], float(s)) for j, s in zip(idxs, best)])
+        return results
+
     def query(self, question: str, top_k: int = 3) -> List[Tuple[DocChunk, float]]:
-        if not self.chunks:
+        """
+        Best `top_k` chunks by TF-IDF cosine. Only chunks sharing a term with
+        the question are returned, so a question with no known term gets []
+        (zero-score chunks are never padded in).
+        """
+        if not self.chunks or self._tfidf is None:
+            return []
+        q_mat = self._transform([question])
+        cand, scores = self._score(q_mat.indices, q_mat.data)
+        idxs, best = self._top_k(cand, scores, max(1, top_k))
+        return [(self.chunks[j], float(s)) for j, s in zip(idxs, best)]
+
+    def query_dense(
+        self, question: str, top_k: int = 3, candidates: Optional[np.ndarray] = None
+    ) -> List[Tuple[DocChunk, float]]:
+        """Rank chunks (or only `candidates` chunk indices) by embedding cosine similarity."""
+        if self.dense is None or not self.chunks:
             return []
-        q_vec = self.vectorizer.transform([question])
-        sims = cosine_similarity(q_vec, self._tfidf)[0]
-        idxs = sims.argsort()[::-1][:max(1, top_k)]
-        return [(self.chunks[i], float(sims[i])) for i in idxs]
+        q_vec = self.embedder.encode([question])
+        idxs, scores = self.dense.search(q_vec, top_k=top_k, candidates=candidates)[0]
+        return [(self.chunks[i], float(s)) for i, s in zip(idxs, scores)]
+
+    def query_hybrid(
+        self,
+        question: str,
+        top_k: int = 3,
+        candidates: int = 200,
+        rrf_k: int = 60,
+        reranker=None,
+    ) -> Tuple[List[Tuple[DocChunk, float]], dict]:
+        """
+        Staged retrieval:
+          1. lexical: TF-IDF postings scoring -> best `candidates` chunks
+          2. dense:   embedding cosine over those candidates only
+          3. fusion:  reciprocal-rank fusion, score = sum 1 / (rrf_k + rank)
+          4. rerank:  optional cross-encoder over the fused top_k
+        If the question shares no term with the corpus, the dense stage falls
+        back to the whole index. Returns (hits, stats) where stats holds
+        per-stage `timings_ms` and `budgets` (how many chunks each stage saw).
+        """
+        timings: Dict[str, float] = {}
+        budgets: Dict[str, int] = {}
+        if not self.chunks or self._tfidf is None:
+            return [], {"timings_ms": timings, "budgets": budgets}
+        k = max(1, top_k)
+
+        t = time.perf_counter()
+        q_mat = self._transform([question])
+        cand, scores = self._score(q_mat.indices, q_mat.data)
+        lex_ids, _ = self._top_k(cand, scores, max(k, candidates))
+        timings["lexical"] = (time.perf_counter() - t) * 1000
+        budgets["lexical"] = int(lex_ids.size)
+
+        fused: Dict[int, float] = {}
+        for rank, i in enumerate(lex_ids):
+            fused[int(i)] = 1.0 / (rrf_k + rank + 1)
+
+        if self.dense is not None:
+            t = time.perf_counter()
+            pool = lex_ids if lex_ids.size else None
+            depth = lex_ids.size if lex_ids.size else max(k, candidates)
+            dense_ids, _ = self.dense.search(
+                self.embedder.encode([question]), top_k=depth, candidates=pool
+            )[0]
+            for rank, i in enumerate(dense_ids):
+                fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (rrf_k + rank + 1)
+            timings["dense"] = (time.perf_counter() - t) * 1000
+            budgets["dense"] = int(dense_ids.size)
+
+        t = time.perf_counter()
+        ranked = sorted(fused.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        timings["fusion"] = (time.perf_counter() - t) * 1000
+
+        hits = [(self.chunks[i], s) for i, s in ranked]
+        if reranker is not None and hits:
+            t = time.perf_counter()
+            rr = reranker.score(question, [c.text for c, _ in hits])
+            order = np.argsort(-rr, kind="stable")
+            hits = [(hits[j][0], float(rr[j])) for j in order]
+            timings["rerank"] = (time.perf_counter() - t) * 1000
+            budgets["rerank"] = len(hits)
+
+        return hits, {"timings_ms": timings, "budgets": budgets}
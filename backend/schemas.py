@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict
 
@@ -7,7 +7,7 @@ class ChunkOut(BaseModel):
     id: int
     page_id: int
     chunk_index: int
-    text: str
+    text: Optional[str] = None
     start_char: int
     end_char: int
 
@@ -16,7 +16,7 @@ class PageOut(BaseModel):
     id: int
     document_id: int
     page_number: int
-    text: str
+    text: Optional[str] = None
     char_count: int
     chunks: List[ChunkOut] = []
 
@@ -30,3 +30,27 @@ class DocumentOut(BaseModel):
 
 class DocumentDetailOut(DocumentOut):
     pages: List[PageOut] = []
+
+class SearchHitOut(BaseModel):
+    id: int
+    document_id: int
+    page_number: int
+    char_count: int
+    score: float
+    snippet: str
+
+class SearchResultsOut(BaseModel):
+    query: str
+    hits: List[SearchHitOut] = []
+    next_cursor: Optional[str] = None
+
+class JobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    filename: str
+    status: str
+    pages_total: int
+    pages_done: int
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
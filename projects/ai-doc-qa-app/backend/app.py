@@ -1,4 +1,4 @@
-import os, sys, tempfile
+import hashlib, os, sys, tempfile
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -10,6 +10,7 @@ if SRC_PATH not in sys.path:
     sys.path.insert(0, SRC_PATH)
 
 from ingestion import load_pdf
+from observability import MetricsMiddleware, metrics_endpoint, span
 
 app = FastAPI(title="AI Doc Q&A Backend")
 
@@ -21,6 +22,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Latency histograms + Server-Timing; X-Profile: $PROFILE_TOKEN samples the process
+# (all threads) while one request runs.
+app.add_middleware(MetricsMiddleware, profile_token=os.getenv("PROFILE_TOKEN"),
+                   profile_dir=os.getenv("PROFILE_DIR", "profiles"))
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 @app.get("/health")
 def health():
@@ -33,11 +39,18 @@ async def upload_pdf(file: UploadFile = File(...)):
 
     # Save to a temp file, then use your ingestion layer
     try:
+        hasher = hashlib.sha256()
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(await file.read())
+            # copy in chunks so large uploads never sit in memory whole
+            while chunk := await file.read(1 << 20):
+                hasher.update(chunk)
+                tmp.write(chunk)
             tmp_path = tmp.name
 
-        text = load_pdf(tmp_path)  # normalize happens inside load_pdf
+        with span("pdf_extract"):
+            # normalize happens inside load_pdf; pages already extracted by
+            # either app or the QA retriever come from the shared page cache
+            text = load_pdf(tmp_path, sha256=hasher.hexdigest())
         preview = text[:1000]
         return {"filename": file.filename, "chars": len(text), "preview": preview}
     except Exception as e:
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for ingestion.normalize_text.
+
+    python scripts/bench_normalize.py [--mb 50] [--repeat 5]
+
+Reports MB/s (of input characters) for the current implementation, the
+chunked normalize_stream, and the previous split/join implementation, on LF
+and CRLF text with and without trailing spaces.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# allow running from repo root without installing a package
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_PATH = os.path.join(REPO_ROOT, "src")
+if SRC_PATH not in sys.path:
+    sys.path.insert(0, SRC_PATH)
+
+from ingestion import normalize_stream, normalize_text
+
+def split_join_normalize(text: str) -> str:
+    """Previous implementation, for comparison."""
+    if not text:
+        return ""
+    text = text.lstrip("﻿")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return text.rstrip("\n")
+
+def make_text(mb: float, eol: str, trailing: bool, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet,", "consectetur", "adipiscing", "elit."]
+    tails = ["", "  ", " \t"] if trailing else [""]
+    lines, size = [], 0
+    while size < mb * 1e6:
+        line = " ".join(rng.choices(words, k=rng.randint(0, 14))) + rng.choice(tails)
+        lines.append(line)
+        size += len(line) + len(eol)
+    return eol.join(lines)
+
+def bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(text) / best / 1e6
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mb", type=float, default=50, help="input size per case (millions of characters)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    impls = {
+        "normalize_text": normalize_text,
+        "normalize_stream(1MB)": lambda t: "".join(
+            normalize_stream(t[i:i + 1_000_000] for i in range(0, len(t), 1_000_000))),
+        "split/join (old)": split_join_normalize,
+    }
+    print(f"{'case':<16}" + "".join(f"{name:>24}" for name in impls))
+    for eol_name, eol in (("LF", "\n"), ("CRLF", "\r\n")):
+        for trailing in (False, True):
+            text = make_text(args.mb, eol, trailing)
+            expected = split_join_normalize(text)
+            cells = []
+            for fn in impls.values():
+                assert fn(text) == expected
+                cells.append(f"{bench(fn, text, args.repeat):>18.0f} MB/s")
+            case = f"{eol_name}{' +trailing' if trailing else ''}"
+            print(f"{case:<16}" + "".join(cells))
+
+if __name__ == "__main__":
+    main()
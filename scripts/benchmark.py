@@ -0,0 +1,361 @@
+"""
+Benchmark suite / regression harness for ingestion, search and QA.
+
+    python scripts/benchmark.py run --size small --out bench.json
+    python scripts/benchmark.py run --size medium --baseline bench.json --threshold 0.15
+    python scripts/benchmark.py compare old.json new.json --threshold 0.15
+
+`run` generates a synthetic corpus (TXT, CSV and reportlab PDFs) in a temp
+directory and measures:
+
+  normalize    normalize_text throughput (MB/s)
+  build        SimpleRetriever.build, cold and no-op rebuild from the persisted index
+  query        SimpleRetriever.query latency (p50/p95) and QPS
+  search       crud.search_pages latency on a SQLite FTS database
+  upload       /upload-pdf throughput (pages/s, upload until extraction job is done)
+
+Results are written as JSON. `compare` (or `run --baseline`) exits with
+status 1 when any metric is worse than the baseline by more than
+`--threshold` (a fraction), so it can gate CI or a nightly job.
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# allow running from repo root without installing a package
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _p in (REPO_ROOT, os.path.join(REPO_ROOT, "src")):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
+
+SIZES = {
+    # txt files x paragraphs, csv rows, pdf files x pages, normalize MB, queries
+    "tiny": dict(txt_files=4, paragraphs=5, csv_rows=50, pdf_files=1, pdf_pages=2, normalize_mb=0.5, queries=20),
+    "small": dict(txt_files=40, paragraphs=20, csv_rows=2_000, pdf_files=4, pdf_pages=10, normalize_mb=5, queries=200),
+    "medium": dict(txt_files=200, paragraphs=40, csv_rows=20_000, pdf_files=10, pdf_pages=40, normalize_mb=20, queries=500),
+    "large": dict(txt_files=1_000, paragraphs=60, csv_rows=200_000, pdf_files=20, pdf_pages=100, normalize_mb=50, queries=1_000),
+}
+SUITES = ("normalize", "build", "query", "search", "upload")
+
+WORDS = (
+    "invoice payment contract supplier warehouse shipment quarterly revenue audit "
+    "customer refund policy network latency server cluster storage backup retention "
+    "employee benefit training compliance privacy security incident report budget "
+    "forecast margin pricing discount inventory logistics carrier delivery schedule"
+).split()
+
+
+# ---------- synthetic corpus ----------
+
+def _sentence(rng: random.Random, n: int = 12) -> str:
+    return " ".join(rng.choices(WORDS, k=n)).capitalize() + "."
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(rng.randint(2, 5)))
+
+def make_pdf(pages: List[str]) -> bytes:
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for text in pages:
+        y = 760
+        for i in range(0, len(text), 90):
+            c.drawString(40, y, text[i:i + 90])
+            y -= 14
+            if y < 40:
+                break
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def make_corpus(root: Path, cfg: dict, seed: int = 0) -> dict:
+    """Write TXT/CSV/PDF files under `root`; returns file and byte counts."""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for i in range(cfg["txt_files"]):
+        text = "\n\n".join(_paragraph(rng) for _ in range(cfg["paragraphs"]))
+        total += (root / f"doc_{i:05d}.txt").write_text(text, encoding="utf-8")
+    if cfg["csv_rows"]:
+        lines = ["id,category,amount,notes"]
+        lines += [f"{r},{rng.choice(WORDS)},{rng.randint(1, 10_000)},{_sentence(rng, 8)}" for r in range(cfg["csv_rows"])]
+        total += (root / "records.csv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    for i in range(cfg["pdf_files"]):
+        data = make_pdf([_paragraph(rng) for _ in range(cfg["pdf_pages"])])
+        (root / f"report_{i:03d}.pdf").write_bytes(data)
+        total += len(data)
+    return {"files": cfg["txt_files"] + bool(cfg["csv_rows"]) + cfg["pdf_files"], "bytes": total}
+
+def make_queries(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(n)]
+
+
+# ---------- measurement helpers ----------
+
+def metric(value: float, unit: str, higher_is_better: bool) -> dict:
+    return {"value": float(f"{value:.6g}"), "unit": unit, "higher_is_better": higher_is_better}
+
+def latencies(fn: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    fn(queries[0])  # warm-up
+    times = []
+    start = time.perf_counter()
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - t0) * 1000)
+    wall = time.perf_counter() - start
+    times.sort()
+    return {
+        "p50_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "qps": len(times) / wall,
+    }
+
+
+# ---------- suites ----------
+
+def bench_normalize(cfg: dict, work: Path) -> Dict[str, dict]:
+    from ingestion import normalize_text
+
+    rng = random.Random(2)
+    lines, size = [], 0
+    while size < cfg["normalize_mb"] * 1e6:
+        line = _sentence(rng) + rng.choice(["", "", "  "])
+        lines.append(line)
+        size += len(line) + 2
+    text = "\r\n".join(lines)
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        normalize_text(text)
+        best = min(best, time.perf_counter() - t0)
+    return {"normalize_text.mb_per_s": metric(len(text) / best / 1e6, "MB/s", True)}
+
+def bench_build(cfg: dict, work: Path, workers: int) -> Dict[str, dict]:
+    from backend.retriever import SimpleRetriever
+
+    index = work / "index" / "bench.npz"
+    t0 = time.perf_counter()
+    r = SimpleRetriever(work / "corpus", index_path=index, workers=workers)
+    n = r.build()
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    SimpleRetriever(work / "corpus", index_path=index, workers=workers).build()
+    noop = time.perf_counter() - t0
+    return {
+        "retriever.build_s": metric(cold, "s", False),
+        "retriever.build_chunks_per_s": metric(n / cold, "chunks/s", True),
+        "retriever.rebuild_noop_s": metric(noop, "s", False),
+    }
+
+def bench_query(cfg: dict, work: Path, workers: int) -> Dict[str, dict]:
+    from backend.retriever import SimpleRetriever
+
+    r = SimpleRetriever(work / "corpus", index_path=work / "index" / "bench.npz", workers=workers)
+    r.build()
+    lat = latencies(lambda q: r.query(q, top_k=5), make_queries(cfg["queries"]))
+    return {
+        "retriever.query_p50_ms": metric(lat["p50_ms"], "ms", False),
+        "retriever.query_p95_ms": metric(lat["p95_ms"], "ms", False),
+        "retriever.query_qps": metric(lat["qps"], "q/s", True),
+    }
+
+def bench_search(cfg: dict, work: Path) -> Dict[str, dict]:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from backend import crud
+    from backend.database import Base
+    from backend.fts import ensure_fts
+
+    engine = create_engine(f"sqlite:///{work / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    ensure_fts(engine)
+    db = sessionmaker(bind=engine)()
+    rng = random.Random(3)
+    n_pages = cfg["txt_files"] * cfg["paragraphs"]
+    t0 = time.perf_counter()
+    for d in range(max(1, n_pages // 50)):
+        crud.upsert_document_with_pages(db, f"doc{d}.pdf", f"{d:064x}", [_paragraph(rng) for _ in range(50)])
+    ingest = time.perf_counter() - t0
+    lat = latencies(lambda q: crud.search_pages(db, q, limit=20), make_queries(cfg["queries"]))
+    db.close()
+    return {
+        "search_pages.ingest_pages_per_s": metric(max(1, n_pages // 50) * 50 / ingest, "pages/s", True),
+        "search_pages.p50_ms": metric(lat["p50_ms"], "ms", False),
+        "search_pages.p95_ms": metric(lat["p95_ms"], "ms", False),
+    }
+
+def bench_upload(cfg: dict, work: Path) -> Dict[str, dict]:
+    from fastapi.testclient import TestClient
+    from backend.app import app
+
+    rng = random.Random(4)
+    pages = max(1, cfg["pdf_pages"])
+    pdfs = [make_pdf([_paragraph(rng) for _ in range(pages)]) for _ in range(max(1, cfg["pdf_files"]))]
+    with TestClient(app) as client:
+        t0 = time.perf_counter()
+        job_ids = []
+        for i, data in enumerate(pdfs):
+            res = client.post("/upload-pdf", files={"file": (f"bench_{i}.pdf", data, "application/pdf")})
+            res.raise_for_status()
+            job_ids.append(res.json()["id"])
+        for job_id in job_ids:
+            while True:
+                job = client.get(f"/jobs/{job_id}").json()
+                if job["status"] in ("done", "failed"):
+                    if job["status"] == "failed":
+                        raise RuntimeError(f"upload job failed: {job.get('error')}")
+                    break
+                time.sleep(0.01)
+        elapsed = time.perf_counter() - t0
+    return {"upload_pdf.pages_per_s": metric(len(pdfs) * pages / elapsed, "pages/s", True)}
+
+
+def state_env(state_dir: Path) -> Dict[str, str]:
+    """Paths of all persistent backend state (database, indexes, caches) under `state_dir`."""
+    return {
+        "APP_DB_PATH": str(state_dir / "app.db"),
+        "QA_INDEX_DIR": str(state_dir / "qa_index"),
+        "QA_EMBED_CACHE_DIR": str(state_dir / "embedding_cache"),
+        "PDF_PAGE_CACHE_DIR": str(state_dir / "pdf_page_cache"),
+    }
+
+
+def run(cfg: dict, suites: List[str], workers: int, state_dir: Optional[Path] = None) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        work = Path(tmp)
+        # Backend modules read these at import time. They always point at the
+        # temp dir, whatever the shell exports: a shared database or page cache
+        # would turn the (fixed-seed) uploads into dedup and cache hits. Only
+        # --state-dir puts them elsewhere.
+        env = state_env(Path(state_dir) if state_dir else work)
+        os.environ.setdefault("EMBED_BACKEND", "hashing")
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+        try:
+            return _run_suites(cfg, suites, workers, work)
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def _run_suites(cfg: dict, suites: List[str], workers: int, work: Path) -> dict:
+    corpus = make_corpus(work / "corpus", cfg) if {"build", "query"} & set(suites) else None
+    metrics: Dict[str, dict] = {}
+    for suite in suites:
+        t0 = time.perf_counter()
+        if suite == "normalize":
+            metrics.update(bench_normalize(cfg, work))
+        elif suite == "build":
+            metrics.update(bench_build(cfg, work, workers))
+        elif suite == "query":
+            metrics.update(bench_query(cfg, work, workers))
+        elif suite == "search":
+            metrics.update(bench_search(cfg, work))
+        elif suite == "upload":
+            metrics.update(bench_upload(cfg, work))
+        print(f"[bench] {suite} done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {**cfg, "workers": workers, "suites": suites},
+        "corpus": corpus,
+        "metrics": metrics,
+    }
+
+
+# ---------- comparison ----------
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """One row per metric present in both; `regressed` when worse by more than `threshold`."""
+    rows = []
+    for name, cur in current["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if cur["higher_is_better"] else change
+        rows.append({"metric": name, "baseline": base["value"], "current": cur["value"],
+                     "unit": cur["unit"], "change": change, "regressed": worse > threshold})
+    return rows
+
+def print_comparison(rows: List[dict], threshold: float) -> bool:
+    """Print the table; True if nothing regressed."""
+    print(f"{'metric':<36}{'baseline':>14}{'current':>14}{'change':>10}")
+    for r in rows:
+        flag = "  REGRESSED" if r["regressed"] else ""
+        print(f"{r['metric']:<36}{r['baseline']:>14.4g}{r['current']:>14.4g}{r['change']:>+10.1%}{flag}")
+    failed = [r["metric"] for r in rows if r["regressed"]]
+    if failed:
+        print(f"{len(failed)} metric(s) regressed by more than {threshold:.0%}: {', '.join(failed)}")
+    return not failed
+
+def print_results(result: dict):
+    for name, m in result["metrics"].items():
+        print(f"{name:<36}{m['value']:>14.4g} {m['unit']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="run benchmarks and write JSON results")
+    p_run.add_argument("--size", choices=sorted(SIZES), default="small")
+    p_run.add_argument("--suites", default=",".join(SUITES), help=f"comma-separated subset of {','.join(SUITES)}")
+    p_run.add_argument("--workers", type=int, default=1, help="SimpleRetriever build workers")
+    p_run.add_argument("--out", type=Path, help="write results JSON here")
+    p_run.add_argument("--baseline", type=Path, help="compare against this results JSON")
+    p_run.add_argument("--threshold", type=float, default=0.15)
+    p_run.add_argument("--state-dir", type=Path,
+                       help="keep the database, indexes and caches here instead of a fresh temp dir "
+                            "(reused across runs: uploads then hit dedup and warm caches)")
+    for key in SIZES["small"]:
+        p_run.add_argument(f"--{key.replace('_', '-')}", type=type(SIZES["small"][key]), help="override size preset")
+
+    p_cmp = sub.add_parser("compare", help="compare two results JSON files")
+    p_cmp.add_argument("baseline", type=Path)
+    p_cmp.add_argument("current", type=Path)
+    p_cmp.add_argument("--threshold", type=float, default=0.15)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "compare":
+        rows = compare(json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.threshold)
+        return 0 if print_comparison(rows, args.threshold) else 1
+
+    cfg = dict(SIZES[args.size])
+    for key in cfg:
+        override = getattr(args, key)
+        if override is not None:
+            cfg[key] = override
+    suites = [s.strip() for s in args.suites.split(",") if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        ap.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    result = run(cfg, suites, args.workers, args.state_dir)
+    print_results(result)
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        rows = compare(json.loads(args.baseline.read_text()), result, args.threshold)
+        return 0 if print_comparison(rows, args.threshold) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
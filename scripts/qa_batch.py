@@ -0,0 +1,89 @@
+"""
+Offline batch QA: the same batching and output as POST /qa/batch, without HTTP.
+
+    python scripts/qa_batch.py questions.jsonl --out answers.jsonl
+    python scripts/qa_batch.py requests.jsonl --field title --id-field request_id --top-k 5
+    cat questions.jsonl | python scripts/qa_batch.py - --data-dir /data/legal --index qa_index/legal.npz
+
+Input is NDJSON (one object per line with the question under --field, or a bare
+JSON string); output is one NDJSON result per input line, in order, written as
+each batch completes. A summary goes to stderr.
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# allow running from repo root without installing a package
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from backend.batch import BATCH_SIZE, answer_batch, iter_batches, parse_line, to_ndjson
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("input", help="NDJSON file of questions, or - for stdin")
+    ap.add_argument("--out", help="write results here instead of stdout")
+    ap.add_argument("--data-dir", default=os.path.join(REPO_ROOT, "sample_data"), help="corpus directory")
+    ap.add_argument("--index", help="persisted index (.npz) to reuse/update, e.g. qa_index/default.npz")
+    ap.add_argument("--recursive", action="store_true", help="include subdirectories of --data-dir")
+    ap.add_argument("--top-k", type=int, default=3)
+    ap.add_argument("--mode", choices=["lexical", "hybrid"], default="lexical")
+    ap.add_argument("--candidates", type=int, default=200, help="lexical-stage budget in hybrid mode")
+    ap.add_argument("--rerank", action="store_true", help="apply RERANK_MODEL in hybrid mode")
+    ap.add_argument("--field", default="question")
+    ap.add_argument("--id-field", default="id")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--text", action="store_true", help="include passage text")
+    ap.add_argument("--highlight", action="store_true", help="include highlighted snippets")
+    args = ap.parse_args(argv)
+
+    from backend.retriever import SimpleRetriever
+    embedder = reranker = None
+    if args.mode == "hybrid":
+        from src.nlp.embeddings import get_embedder
+        embedder = get_embedder()
+        if args.rerank:
+            from src.nlp.rerank import get_reranker
+            reranker = get_reranker()
+
+    t0 = time.perf_counter()
+    retriever = SimpleRetriever(Path(args.data_dir), index_path=Path(args.index) if args.index else None,
+                                embedder=embedder, recursive=args.recursive)
+    n_chunks = retriever.build()
+    built = time.perf_counter() - t0
+    if not n_chunks:
+        print(f"No chunks indexed from {args.data_dir}", file=sys.stderr)
+        return 1
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    answered = errors = 0
+    t0 = time.perf_counter()
+    try:
+        records = (parse_line(line, i, args.field, args.id_field) for i, line in enumerate(src, 1))
+        for batch in iter_batches(records, max(1, args.batch_size)):
+            rows = answer_batch(retriever, batch, args.top_k, args.mode, args.candidates, reranker,
+                                args.text, args.highlight)
+            out.write(to_ndjson(rows))
+            out.flush()
+            errors += sum(1 for r in rows if "error" in r)
+            answered += len(rows)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(f"{answered} lines ({errors} errors) over {n_chunks} chunks in {elapsed:.2f}s "
+          f"({answered / elapsed if elapsed else 0:.0f}/s); index ready in {built:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
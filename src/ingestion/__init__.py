@@ -1,5 +1,5 @@
-from .pdf_loader import load_pdf
-from .text_loader import load_text
-from .csv_loader import load_csv
-from .utils import normalize_text
-
+from .pdf_loader import load_pdf, iter_pdf_pages, extract_pdf_pages, pdf_page_count
+from .page_cache import PageCache, default_page_cache
+from .text_loader import load_text, iter_text_lines
+from .csv_loader import load_csv, iter_csv, row_texts
+from .utils import normalize_text, normalize_stream
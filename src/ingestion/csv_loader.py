@@ -1,3 +1,4 @@
+from typing import Iterator, Optional, Sequence
 import pandas as pd
 
 def load_csv(path: str, **read_csv_kwargs) -> pd.DataFrame:
@@ -7,3 +8,25 @@ def load_csv(path: str, **read_csv_kwargs) -> pd.DataFrame:
     """
     return pd.read_csv(path, **read_csv_kwargs)
 
+def iter_csv(path: str, chunksize: int = 50_000, **read_csv_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV as DataFrames of at most `chunksize` rows, so memory stays
+    bounded by the chunk, not the file. The row index continues across chunks.
+    Example: for df in iter_csv("big.csv", usecols=["id", "title"]): ...
+    """
+    with pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs) as reader:
+        yield from reader
+
+def row_texts(df: pd.DataFrame, columns: Optional[Sequence[str]] = None, sep: str = " | ") -> pd.Series:
+    """
+    One "col: value | col: value" string per row, built column-wise with
+    vectorized string ops instead of a Python loop over rows.
+    """
+    cols = list(columns) if columns is not None else list(df.columns)
+    if not cols:
+        return pd.Series([""] * len(df), index=df.index, dtype=object)
+    # fillna: newer pandas keeps missing values missing through astype(str)
+    out = f"{cols[0]}: " + df[cols[0]].astype(str).fillna("nan")
+    for col in cols[1:]:
+        out = out + f"{sep}{col}: " + df[col].astype(str).fillna("nan")
+    return out
@@ -0,0 +1,199 @@
+"""
+Content-addressed cache of extracted PDF page text, shared by every code path
+(and process) that parses PDFs.
+
+One SQLite file holds:
+  files(sha256, pages)            page count per PDF
+  pages(sha256, page, text_id)    page -> text, keyed by file hash + 0-based page
+  texts(text_id, data, size, used) zlib-compressed page text, keyed by its own hash
+
+Identical pages in different PDFs (cover pages, boilerplate) share one `texts`
+row. The cache is bounded by PDF_PAGE_CACHE_MAX_BYTES of compressed text;
+least-recently-used texts are evicted first. Recency is tracked to within
+PDF_PAGE_CACHE_TOUCH_SECONDS: a hit only writes when the text's last-use stamp
+is older than that, so repeated lookups stay read-only and do not contend for
+the write lock. Entries are tagged with the
+pdfplumber version, and a different version starts an empty cache.
+"""
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+CACHE_DIR = os.getenv("PDF_PAGE_CACHE_DIR", "pdf_page_cache")  # "" disables the cache
+CACHE_MAX_BYTES = int(os.getenv("PDF_PAGE_CACHE_MAX_BYTES", str(1 << 30)))
+TOUCH_SECONDS = float(os.getenv("PDF_PAGE_CACHE_TOUCH_SECONDS", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (sha256 TEXT PRIMARY KEY, pages INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pages (
+    sha256 TEXT NOT NULL, page INTEGER NOT NULL, text_id BLOB NOT NULL,
+    PRIMARY KEY (sha256, page)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pages_text ON pages (text_id);
+CREATE TABLE IF NOT EXISTS texts (
+    text_id BLOB PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS texts_used ON texts (used);
+"""
+
+
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _extractor() -> str:
+    try:
+        return f"pdfplumber-{metadata.version('pdfplumber')}"
+    except metadata.PackageNotFoundError:
+        return "pdfplumber"
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class PageCache:
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES, touch_seconds: float = TOUCH_SECONDS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.touch_ms = int(touch_seconds * 1000)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection per instance; several processes may share the file (WAL).
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT value FROM meta WHERE key = 'extractor'").fetchone()
+                if row is None or row[0] != _extractor():
+                    self._db.execute("DELETE FROM pages")
+                    self._db.execute("DELETE FROM texts")
+                    self._db.execute("DELETE FROM files")
+                    self._db.execute("INSERT OR REPLACE INTO meta VALUES ('extractor', ?)", (_extractor(),))
+                    self._db.execute("INSERT OR REPLACE INTO meta VALUES ('bytes', '0')")
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def page_count(self, sha256: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute("SELECT pages FROM files WHERE sha256 = ?", (sha256,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_page_count(self, sha256: str, pages: int):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (sha256, pages))
+
+    def get_many(self, sha256: str, pages: Iterable[int]) -> Dict[int, str]:
+        """{page: text} for the requested pages that are cached."""
+        wanted = list(pages)
+        if not wanted:
+            return {}
+        span = (sha256, min(wanted), max(wanted))
+        wanted_set = set(wanted)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.page, t.data, t.text_id, t.used FROM pages p JOIN texts t ON t.text_id = p.text_id "
+                "WHERE p.sha256 = ? AND p.page BETWEEN ? AND ?", span,
+            ).fetchall()
+            rows = [r for r in rows if r[0] in wanted_set]
+            now = _now_ms()
+            stale = list({(now, text_id) for _, _, text_id, used in rows if now - used >= self.touch_ms})
+            if stale:  # one small write transaction, at most once per text per touch interval
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._db.executemany("UPDATE texts SET used = ? WHERE text_id = ?", stale)
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        return {page: zlib.decompress(data).decode("utf-8") for page, data, _, _ in rows}
+
+    def put_many(self, sha256: str, texts: Dict[int, str]):
+        """Store {page: text} for one file, then evict down to the size budget."""
+        if not texts:
+            return
+        now = _now_ms()
+        entries = []
+        for page, text in texts.items():
+            raw = text.encode("utf-8")
+            entries.append((page, hashlib.sha256(raw).digest()[:16], raw))
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                added = 0
+                for page, text_id, raw in entries:
+                    if self._db.execute("SELECT 1 FROM texts WHERE text_id = ?", (text_id,)).fetchone():
+                        self._db.execute("UPDATE texts SET used = ? WHERE text_id = ?", (now, text_id))
+                    else:
+                        data = zlib.compress(raw, 6)
+                        self._db.execute("INSERT INTO texts VALUES (?, ?, ?, ?)", (text_id, data, len(data), now))
+                        added += len(data)
+                    self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", (sha256, page, text_id))
+                total = self._add_bytes(added)
+                if total > self.max_bytes:
+                    self._evict(total)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, = self._db.execute("SELECT COUNT(*) FROM files").fetchone()
+            pages, = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()
+            texts, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM texts").fetchone()
+        return {"files": files, "pages": pages, "texts": texts, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _add_bytes(self, delta: int) -> int:
+        self._db.execute("UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = 'bytes'", (delta,))
+        return int(self._db.execute("SELECT value FROM meta WHERE key = 'bytes'").fetchone()[0])
+
+    def _evict(self, total: int):
+        """Drop least-recently-used texts (and pages pointing at them) to 90% of the budget."""
+        target = int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        cur = self._db.execute("SELECT text_id, size FROM texts ORDER BY used")
+        for text_id, size in cur:
+            if total - freed <= target:
+                break
+            victims.append((text_id,))
+            freed += size
+        cur.close()
+        self._db.executemany("DELETE FROM pages WHERE text_id = ?", victims)
+        self._db.executemany("DELETE FROM texts WHERE text_id = ?", victims)
+        self._add_bytes(-freed)
+
+
+_default: Optional[PageCache] = None
+_default_pid: Optional[int] = None
+_default_lock = threading.Lock()
+
+def default_page_cache() -> Optional[PageCache]:
+    """Process-wide cache under PDF_PAGE_CACHE_DIR; None when that is set to ""."""
+    global _default, _default_pid
+    if not CACHE_DIR:
+        return None
+    with _default_lock:
+        # Never reuse a connection inherited through fork.
+        if _default is None or _default_pid != os.getpid():
+            _default = PageCache(os.path.join(CACHE_DIR, "pages.sqlite"))
+            _default_pid = os.getpid()
+        return _default
@@ -1,16 +1,86 @@
-from typing import Optional
-import pdfplumber
+from typing import Dict, Iterator, List, Optional, Tuple
+from .page_cache import PageCache, default_page_cache, sha256_file
 from .utils import normalize_text
 
-def load_pdf(path: str, *, normalize: bool = True) -> str:
+# Pages extracted between cache writes while streaming a partly cached PDF.
+_PUT_BATCH = 16
+
+def _cache_for(path: str, sha256: Optional[str], use_cache: bool) -> Tuple[Optional[PageCache], Optional[str]]:
+    cache = default_page_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    return cache, sha256 or sha256_file(path)
+
+def load_pdf(path: str, *, normalize: bool = True, sha256: Optional[str] = None) -> str:
     """Extract text from a PDF file, concatenating page text."""
-    text_parts = []
-    with pdfplumber.open(path) as pdf:
-        for page in pdf.pages:
-            # Some PDFs return None for empty pages
-            page_text: Optional[str] = page.extract_text()
-            if page_text:
-                text_parts.append(page_text)
-    text = "\n".join(text_parts)
+    text = "\n".join(t for t in iter_pdf_pages(path, normalize=False, sha256=sha256) if t)
     return normalize_text(text) if normalize else text
 
+def pdf_page_count(path: str, *, sha256: Optional[str] = None, use_cache: bool = True) -> int:
+    cache, sha256 = _cache_for(path, sha256, use_cache)
+    n = cache.page_count(sha256) if cache else None
+    if n is None:
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            n = len(pdf.pages)
+        if cache:
+            cache.set_page_count(sha256, n)
+    return n
+
+def extract_pdf_pages(path: str, start: int = 0, stop: Optional[int] = None, *,
+                      sha256: Optional[str] = None, use_cache: bool = True) -> List[str]:
+    """
+    Raw text of pages [start, stop) ("" for pages without text). Pages found in
+    the page cache (keyed by `sha256`, hashed from the file if not given) skip
+    pdfplumber entirely; the rest are extracted and added to it.
+    """
+    cache, sha256 = _cache_for(path, sha256, use_cache)
+    if stop is None:
+        stop = pdf_page_count(path, sha256=sha256, use_cache=use_cache)
+    texts: Dict[int, str] = cache.get_many(sha256, range(start, stop)) if cache else {}
+    missing = [i for i in range(start, stop) if i not in texts]
+    if missing:
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            for i in missing:
+                page = pdf.pages[i]
+                texts[i] = page.extract_text() or ""  # some PDFs return None for empty pages
+                page.close()
+        if cache:
+            cache.put_many(sha256, {i: texts[i] for i in missing})
+    return [texts[i] for i in range(start, stop)]
+
+def iter_pdf_pages(path: str, *, normalize: bool = True, sha256: Optional[str] = None,
+                   use_cache: bool = True) -> Iterator[str]:
+    """
+    Lazily yield the text of each page ("" for pages without text), so the
+    i-th item is page i. Each page's parsed layout is released once its text
+    is extracted, keeping memory flat for long documents. A fully cached PDF
+    is served from the page cache without opening it.
+    """
+    cache, sha256 = _cache_for(path, sha256, use_cache)
+    n = cache.page_count(sha256) if cache else None
+    cached = cache.get_many(sha256, range(n)) if n else {}
+    if n is not None and len(cached) == n:
+        for i in range(n):
+            yield normalize_text(cached[i]) if normalize else cached[i]
+        return
+
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        if cache:
+            cache.set_page_count(sha256, len(pdf.pages))
+        fresh: Dict[int, str] = {}
+        for i, page in enumerate(pdf.pages):
+            page_text = cached.get(i)
+            if page_text is None:
+                # Some PDFs return None for empty pages
+                page_text = page.extract_text() or ""
+                fresh[i] = page_text
+            page.close()
+            if cache and len(fresh) >= _PUT_BATCH:
+                cache.put_many(sha256, fresh)
+                fresh = {}
+            yield normalize_text(page_text) if normalize else page_text
+        if cache:
+            cache.put_many(sha256, fresh)
@@ -1,8 +1,18 @@
-from .utils import smart_open_text, normalize_text
+from typing import Iterator
+from .utils import iter_lines, smart_open_text, normalize_text
 
 def load_text(path: str, *, normalize: bool = True) -> str:
     """Read a plain text file with robust encoding handling."""
+    if normalize:
+        return "\n".join(iter_text_lines(path))
     with smart_open_text(path) as f:
-        data = f.read()
-    return normalize_text(data) if normalize else data
+        return f.read()
 
+def iter_text_lines(path: str, *, normalize: bool = True) -> Iterator[str]:
+    """
+    Lazily yield the lines of a text file (without line endings), decoding as
+    it reads, so memory stays flat for large logs and dumps.
+    Example: for line in iter_text_lines("app.log"): ...
+    """
+    with smart_open_text(path) as f:
+        yield from iter_lines(f, normalize=normalize)
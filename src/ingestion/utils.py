@@ -1,48 +1,112 @@
 from contextlib import contextmanager
-import io
+from typing import Iterable, Iterator
+import codecs
+import re
 import chardet
 
+# Matched against the *reversed* text: a newline followed by the whitespace that
+# preceded it. Starting with a literal lets the regex engine skip ahead to the
+# next "\n" instead of trying a match at every space between words.
+_EOL_TRAILING_WS_REVERSED = re.compile(r"\n[^\S\n]+")
+
+NORMALIZE_BLOCK_CHARS = 1 << 20
+
+def _strip_line_ends(text: str) -> str:
+    """Unify newlines to \n and drop whitespace before each newline."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return _EOL_TRAILING_WS_REVERSED.sub("\n", text[::-1])[::-1]
+
 def normalize_text(text: str) -> str:
     """
     Basic cleanup:
       - strip BOMs
       - unify newlines to \n
       - trim trailing spaces on lines
-      - collapse excessive blank lines (optional, conservative)
+      - remove trailing blank lines
+    Runs normalize_stream over NORMALIZE_BLOCK_CHARS slices, so the reversed
+    copies _strip_line_ends makes are block-sized and stay in cache.
     """
     if not text:
         return ""
-    # Remove UTF-8 BOM if present
-    text = text.lstrip("\ufeff")
-    # Normalize newlines
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-    # Trim right spaces per line
-    text = "\n".join(line.rstrip() for line in text.split("\n"))
-    # 👇 remove trailing newline(s)
-    text = text.rstrip("\n")
-    return text
+    n = NORMALIZE_BLOCK_CHARS
+    return "".join(normalize_stream(text[i:i + n] for i in range(0, len(text), n)))
+
+def normalize_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    normalize_text over text arriving in pieces (e.g. f.read(1 << 20) blocks):
+    "".join(normalize_stream(chunks)) == normalize_text("".join(chunks)).
+    Whitespace after the last non-space character of a piece is held back
+    until the next piece shows whether it is trailing.
+    """
+    carry = ""
+    at_start = True
+    for chunk in chunks:
+        buf = carry + chunk
+        if at_start:
+            buf = buf.lstrip("\ufeff")
+            at_start = not buf
+        end = len(buf.rstrip())
+        carry = buf[end:]
+        if end:
+            yield _strip_line_ends(buf[:end])
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+def detect_encoding(path: str, sample_bytes: int = ENCODING_SAMPLE_BYTES,
+                    fallback_encodings=("utf-8", "latin-1")) -> str:
+    """
+    Guess a file's encoding with chardet from its first `sample_bytes` only,
+    so detection cost doesn't grow with file size.
+    """
+    with open(path, "rb") as fb:
+        sample = fb.read(sample_bytes)
+    enc = chardet.detect(sample).get("encoding") or fallback_encodings[0]
+    # An ASCII prefix says nothing about the rest of the file; UTF-8 is a superset.
+    if enc.lower() == "ascii":
+        enc = "utf-8"
+    for candidate in (enc, *fallback_encodings):
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "latin-1"
 
 @contextmanager
 def smart_open_text(path: str, fallback_encodings=("utf-8", "latin-1")):
     """
     Open text with best-effort encoding detection.
-    Tries chardet, then fallbacks.
+    Detects on a bounded prefix (detect_encoding), then decodes incrementally
+    as the file is read, so the whole file is never held as bytes.
+    Line endings are left as-is (newline=""); normalize_text unifies them.
     Yields a TextIOBase.
     """
-    # Try detection with chardet
-    with open(path, "rb") as fb:
-        raw = fb.read()
-    guessed = chardet.detect(raw)
-    enc = guessed.get("encoding") or fallback_encodings[0]
-
-    try:
-        yield io.StringIO(raw.decode(enc, errors="ignore"))
-    except LookupError:
-        # If unknown codec, try fallbacks
-        for fe in fallback_encodings:
-            try:
-                yield io.StringIO(raw.decode(fe, errors="ignore"))
-                break
-            except Exception:
-                continue
+    enc = detect_encoding(path, fallback_encodings=fallback_encodings)
+    with open(path, "r", encoding=enc, errors="ignore", newline="") as f:
+        yield f
 
+def iter_lines(f, *, normalize: bool = True) -> Iterator[str]:
+    """
+    Lines of an open text stream, without line endings. With `normalize`,
+    the result joined by "\n" equals normalize_text(f.read()): BOM stripped,
+    right-trimmed lines, trailing blank lines dropped (held back until a
+    non-blank line shows they are not trailing).
+    """
+    first = True
+    blank = 0
+    for line in f:
+        line = line.rstrip("\r\n")
+        if not normalize:
+            yield line
+            continue
+        if first:
+            line = line.lstrip("\ufeff")
+            first = False
+        line = line.rstrip()
+        if not line:
+            blank += 1
+            continue
+        for _ in range(blank):
+            yield ""
+        blank = 0
+        yield line
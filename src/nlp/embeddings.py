@@ -1,13 +1,220 @@
-from typing import List
-import math
+"""
+Text embeddings for retrieval.
+
+- Backends: CPU sentence-transformers model, or a deterministic hashing
+  embedder (no model download; used for tests and as a fallback).
+- EmbeddingCache: content-hash keyed, on-disk float32 memmap, so unchanged
+  chunks are never re-embedded.
+- VectorIndex: exact inner-product top-k over L2-normalized vectors.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import os
+import re
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: cache writes are then single-process only
+    fcntl = None
+
+DEFAULT_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+
+class HashingEmbedder:
+    """Deterministic signed feature hashing of word uni/bi-grams; L2-normalized."""
+
+    def __init__(self, dim: int = 384):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._vectorizer = HashingVectorizer(
+            n_features=dim, ngram_range=(1, 2), alternate_sign=True, norm="l2"
+        )
+
+    def encode(self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            out[start:start + len(batch)] = self._vectorizer.transform(batch).toarray()
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """CPU sentence-transformers model; outputs are L2-normalized float32."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, device: str = "cpu"):
+        from sentence_transformers import SentenceTransformer  # heavy: import only when used
+
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def encode(self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        vecs = self.model.encode(
+            list(texts),
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return vecs.astype(np.float32, copy=False)
+
+
+def get_embedder(kind: Optional[str] = None):
+    """
+    kind: "sentence-transformers", "hashing" or "auto" (default, env EMBED_BACKEND):
+    auto uses sentence-transformers when it is installed and the model loads.
+    """
+    kind = kind or os.getenv("EMBED_BACKEND", "auto")
+    if kind == "hashing":
+        return HashingEmbedder()
+    if kind in ("auto", "sentence-transformers"):
+        try:
+            return SentenceTransformerEmbedder()
+        except (ImportError, OSError) as ex:
+            if kind != "auto":
+                raise
+            print(f"[embeddings] sentence-transformers unavailable ({ex}); using hashing embedder")
+            return HashingEmbedder()
+    raise ValueError(f"Unknown embedding backend: {kind}")
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk cache: `vectors.f32` holds float32 rows (read through a
+    memmap), `keys.txt` holds one sha256(text) per row. One directory per model.
+    """
+
+    def __init__(self, cache_dir: Path, embedder):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.dir = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "_", embedder.name)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._vec_path = self.dir / "vectors.f32"
+        self._keys_path = self.dir / "keys.txt"
+        self._rows: Dict[str, int] = {}
+        self._mm: Optional[np.memmap] = None
+        self._reload()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.dir / ".lock", "w") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf, fcntl.LOCK_UN)
+
+    def _reload(self):
+        keys = self._keys_path.read_text().split() if self._keys_path.exists() else []
+        row_bytes = self.dim * 4
+        n_vecs = self._vec_path.stat().st_size // row_bytes if self._vec_path.exists() else 0
+        # Vectors are written before keys, so any surplus vectors are an interrupted append.
+        keys = keys[:n_vecs]
+        self._rows = {k: i for i, k in enumerate(keys)}
+        self._mm = None
+
+    def _matrix(self) -> np.ndarray:
+        n = len(self._rows)
+        if self._mm is None or self._mm.shape[0] != n:
+            if n == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._mm = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return self._mm
+
+    def embed(self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        keys = [self.key(t) for t in texts]
+        missing: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in self._rows and k not in missing:
+                missing[k] = t
+        if missing:
+            with self._lock():
+                self._reload()  # another process may have appended meanwhile
+                todo = [(k, t) for k, t in missing.items() if k not in self._rows]
+                if todo:
+                    vecs = self.embedder.encode([t for _, t in todo], batch_size=batch_size)
+                    n = len(self._rows)
+                    with open(self._vec_path, "r+b" if self._vec_path.exists() else "wb") as f:
+                        f.truncate(n * self.dim * 4)
+                        f.seek(0, os.SEEK_END)
+                        f.write(np.ascontiguousarray(vecs, dtype=np.float32).tobytes())
+                    with open(self._keys_path, "w" if n == 0 else "a") as f:
+                        f.write("".join(k + "\n" for k, _ in todo))
+                    self._reload()
+        if not keys:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.asarray(self._matrix()[[self._rows[k] for k in keys]], dtype=np.float32)
+
+
+class VectorIndex:
+    """Exact inner-product search over L2-normalized vectors (cosine similarity)."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int = 10,
+        candidates: Optional[np.ndarray] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k rows per query as (row ids, scores), best first. If `candidates`
+        is given, only those row ids are scored.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        ids = np.arange(len(self)) if candidates is None else np.asarray(candidates, dtype=np.int64)
+        if ids.size == 0:
+            return [(ids, np.empty(0, dtype=np.float32)) for _ in queries]
+        mat = self.vectors if candidates is None else self.vectors[ids]
+        scores = queries @ mat.T
+        k = min(max(1, top_k), ids.size)
+        results = []
+        for row in scores:
+            part = np.argpartition(-row, k - 1)[:k] if row.size > k else np.arange(row.size)
+            part = part[np.lexsort((part, -row[part]))]
+            results.append((ids[part], row[part]))
+        return results
+
+
+_default_embedder = None
+
+
+def embed(texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE, embedder=None) -> np.ndarray:
+    """Encode texts with `embedder` (default: get_embedder(), created once)."""
+    global _default_embedder
+    if embedder is None:
+        if _default_embedder is None:
+            _default_embedder = get_embedder()
+        embedder = _default_embedder
+    return embedder.encode(list(texts), batch_size=batch_size)
+
 
 def dummy_embed(texts: List[str]) -> List[List[float]]:
     """
-    Stub embedding: returns a trivial 3D vector per text.
-    Replace with SentenceTransformers or Azure OpenAI embeddings.
+    Old name, kept for callers of the former 3D stub: embed() as plain lists.
+    Uses get_embedder(), so with EMBED_BACKEND=auto it may load (and download)
+    a sentence-transformers model.
     """
-    out = []
-    for t in texts:
-        l = len(t)
-        out.append([l, math.log1p(l), (l % 7) / 7.0])
-    return out
+    return embed(texts).tolist()
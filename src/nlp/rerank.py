@@ -0,0 +1,35 @@
+"""Optional CPU cross-encoder re-ranking (sentence-transformers CrossEncoder)."""
+from __future__ import annotations
+from typing import Optional, Sequence
+import os
+
+import numpy as np
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODEL, device: str = "cpu"):
+        from sentence_transformers import CrossEncoder  # heavy: import only when used
+
+        self.model = CrossEncoder(model_name, device=device)
+        self.name = model_name
+
+    def score(self, query: str, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """Relevance score per text (higher is better)."""
+        if not texts:
+            return np.empty(0, dtype=np.float32)
+        pairs = [(query, t) for t in texts]
+        return np.asarray(self.model.predict(pairs, batch_size=batch_size, show_progress_bar=False))
+
+
+def get_reranker(model_name: Optional[str] = None) -> Optional[CrossEncoderReranker]:
+    """Reranker for `model_name` (default env RERANK_MODEL); None if unset or unavailable."""
+    model_name = model_name or os.getenv("RERANK_MODEL")
+    if not model_name:
+        return None
+    try:
+        return CrossEncoderReranker(model_name)
+    except (ImportError, OSError) as ex:
+        print(f"[rerank] Cross-encoder unavailable ({ex}); re-ranking disabled")
+        return None
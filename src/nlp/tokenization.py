@@ -1,4 +1,38 @@
-from typing import List
+"""
+Tokenization and chunking.
+
+Chunker splits text into chunks of at most `max_tokens` tokens and `max_chars`
+characters, returned as exact (start_char, end_char) offsets into the text it
+was given, so `text[start:end]` is the chunk. Boundaries are chosen in order of
+preference:
+
+- paragraphs (separated by blank lines) are packed whole while they fit;
+- a paragraph too big for one chunk is packed sentence by sentence;
+- a sentence too big for one chunk becomes consecutive token windows.
+
+`overlap` repeats up to that many tokens of whole trailing sentences or
+paragraphs at the start of the next chunk (and overlaps token windows by that
+many tokens). Tokens are word runs and single punctuation marks, which tracks
+model tokenizers more closely than whitespace splitting. Token lists are only
+built for oversized sentences; counts use `findall` over offset ranges, and a
+unit's length in characters (an upper bound on its token count) is used before
+counting at all.
+"""
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import os
+import re
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "160"))
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "800"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# A paragraph: starts at a non-space char, runs until a blank line or end of text.
+_PARA_RE = re.compile(r"\S[\s\S]*?(?=\n[ \t]*\n|\Z)")
+# End of a sentence: terminal punctuation (plus closing quotes/brackets) before whitespace.
+_SENT_END_RE = re.compile(r"[.!?]+[\"'’”)\]]*(?=\s)")
+_NON_SPACE_RE = re.compile(r"\S")
+
 
 def simple_whitespace_tokenize(text: str) -> List[str]:
     """
@@ -6,3 +40,166 @@ def simple_whitespace_tokenize(text: str) -> List[str]:
     Replace later with nltk/transformers tokenizers as needed.
     """
     return text.split()
+
+def count_tokens(text: str, start: int = 0, end: Optional[int] = None) -> int:
+    """Number of Chunker tokens in text[start:end], without slicing the text."""
+    return len(_TOKEN_RE.findall(text, start, len(text) if end is None else end))
+
+
+class TextChunk(NamedTuple):
+    start_char: int
+    end_char: int
+    text: str
+
+class PageChunk(NamedTuple):
+    page: int  # position in the page iterator, plus `first_page`
+    index: int  # chunk number within the page
+    start_char: int
+    end_char: int
+    text: str
+
+
+class Chunker:
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, overlap: int = CHUNK_OVERLAP_TOKENS,
+                 max_chars: int = CHUNK_MAX_CHARS):
+        if max_tokens < 1 or max_chars < 1:
+            raise ValueError("max_tokens and max_chars must be positive")
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be in [0, max_tokens)")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.max_chars = max_chars
+
+    def params(self) -> dict:
+        """Settings that determine chunk boundaries (for index invalidation)."""
+        return {"max_tokens": self.max_tokens, "overlap": self.overlap, "max_chars": self.max_chars}
+
+    def __repr__(self) -> str:
+        return f"Chunker(max_tokens={self.max_tokens}, overlap={self.overlap}, max_chars={self.max_chars})"
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """(start_char, end_char) of each chunk of `text`, in order."""
+        out: List[Tuple[int, int]] = []
+        # Units of the open chunk as [start, end, tokens]; tokens is None until
+        # counted. `fresh` counts units not carried over as overlap.
+        cur: List[list] = []
+        fresh = 0
+        for s, e, n in self._units(text):
+            if n == -1:  # a window of an oversized sentence: always its own chunk
+                if fresh:
+                    out.append((cur[0][0], cur[-1][1]))
+                cur, fresh = [], 0
+                out.append((s, e))
+                continue
+            unit = [s, e, n]
+            if cur and self._fits(text, cur, unit):
+                cur.append(unit)
+                fresh += 1
+                continue
+            if fresh:
+                out.append((cur[0][0], cur[-1][1]))
+                cur = self._overlap_tail(text, cur)
+            while cur and not self._fits(text, cur, unit):
+                cur.pop(0)
+            cur.append(unit)
+            fresh = 1
+        if fresh:
+            out.append((cur[0][0], cur[-1][1]))
+        return out
+
+    def chunks(self, text: str) -> List[TextChunk]:
+        return [TextChunk(s, e, text[s:e]) for s, e in self.spans(text)]
+
+    def iter_pages(self, pages: Iterable[str], first_page: int = 0) -> Iterator[PageChunk]:
+        """Chunk a stream of page texts one page at a time; offsets are into each page's text."""
+        for p_i, page_text in enumerate(pages, first_page):
+            for c_i, (s, e) in enumerate(self.spans(page_text)):
+                yield PageChunk(p_i, c_i, s, e, page_text[s:e])
+
+    # ---------- internals ----------
+
+    def _tokens(self, text: str, unit: list) -> int:
+        if unit[2] is None:
+            unit[2] = count_tokens(text, unit[0], unit[1])
+        return unit[2]
+
+    def _fits(self, text: str, cur: List[list], unit: list) -> bool:
+        if unit[1] - cur[0][0] > self.max_chars:
+            return False
+        # Characters bound tokens from above; count only when the bound is not enough.
+        if sum(u[1] - u[0] if u[2] is None else u[2] for u in cur) + unit[1] - unit[0] <= self.max_tokens:
+            return True
+        return sum(self._tokens(text, u) for u in cur) + self._tokens(text, unit) <= self.max_tokens
+
+    def _overlap_tail(self, text: str, cur: List[list]) -> List[list]:
+        tail: List[list] = []
+        budget = self.overlap
+        for unit in reversed(cur[1:]):
+            budget -= self._tokens(text, unit)
+            if budget < 0:
+                break
+            tail.insert(0, unit)
+        return tail
+
+    def _fits_alone(self, text: str, s: int, e: int) -> Tuple[bool, Optional[int]]:
+        if e - s > self.max_chars:
+            return False, None
+        if e - s <= self.max_tokens:
+            return True, None
+        n = count_tokens(text, s, e)
+        return n <= self.max_tokens, n
+
+    def _units(self, text: str) -> Iterator[Tuple[int, int, Optional[int]]]:
+        """(start, end, tokens or None) packing units; tokens == -1 marks a standalone window."""
+        for m in _PARA_RE.finditer(text):
+            s, e = m.start(), m.start() + len(m.group().rstrip())
+            ok, n = self._fits_alone(text, s, e)
+            if ok:
+                yield s, e, n
+                continue
+            for ss, se in self._sentences(text, s, e):
+                ok, n = self._fits_alone(text, ss, se)
+                if ok:
+                    yield ss, se, n
+                else:
+                    for ws, we in self._windows(text, ss, se):
+                        yield ws, we, -1
+
+    @staticmethod
+    def _sentences(text: str, s: int, e: int) -> Iterator[Tuple[int, int]]:
+        start = s
+        for m in _SENT_END_RE.finditer(text, s, e):
+            yield start, m.end()
+            nxt = _NON_SPACE_RE.search(text, m.end(), e)
+            if nxt is None:
+                return
+            start = nxt.start()
+        yield start, e
+
+    def _windows(self, text: str, s: int, e: int) -> Iterator[Tuple[int, int]]:
+        toks: List[Tuple[int, int]] = []
+        for m in _TOKEN_RE.finditer(text, s, e):
+            a, b = m.span()
+            while b - a > self.max_chars:  # hard-cut runs longer than a chunk
+                toks.append((a, a + self.max_chars))
+                a += self.max_chars
+            toks.append((a, b))
+        i = 0
+        while i < len(toks):
+            start, j = toks[i][0], i
+            while j < len(toks) and j - i < self.max_tokens and toks[j][1] - start <= self.max_chars:
+                j += 1
+            yield start, toks[j - 1][1]
+            if j == len(toks):
+                return
+            i = max(j - self.overlap, i + 1)
+
+
+_default: Optional[Chunker] = None
+
+def default_chunker() -> Chunker:
+    """Chunker configured by CHUNK_MAX_TOKENS / CHUNK_MAX_CHARS / CHUNK_OVERLAP_TOKENS."""
+    global _default
+    if _default is None:
+        _default = Chunker()
+    return _default
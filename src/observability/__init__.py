@@ -0,0 +1,3 @@
+from .metrics import REGISTRY, Counter, Histogram, Registry, span
+from .middleware import MetricsMiddleware, metrics_endpoint, metrics_response
+from .profiler import SamplingProfiler
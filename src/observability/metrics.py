@@ -0,0 +1,160 @@
+"""
+In-process metrics with Prometheus text exposition (no client library, no
+external service).
+
+- Histogram: fixed buckets, optional labels, thread-safe.
+- Counter: monotonically increasing, optional labels, thread-safe.
+- span(name): times a block into `span_duration_seconds{span=...}` and, when
+  called during an instrumented request, into that request's breakdown
+  (reported as a Server-Timing header by MetricsMiddleware).
+
+Metrics are per process: with several uvicorn workers each one reports its
+own numbers.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+
+# Seconds; covers sub-millisecond spans up to slow uploads.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[List[int], float, int]]:
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, n) in sorted(self.snapshot().items()):
+            base = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, key)]
+            cumulative = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts + [n - sum(counts)]):
+                cumulative += c
+                labels = ",".join(base + [f'le="{_fmt(le)}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {cumulative}")
+            suffix = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total!r}")
+            lines.append(f"{self.name}_count{suffix} {n}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, key))
+            lines.append(f"{self.name}{{{labels}}} {_fmt(value)}" if labels else f"{self.name} {_fmt(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add `metric`, or return the one already registered under its name."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SPAN_SECONDS = REGISTRY.histogram(
+    "span_duration_seconds", "Time spent in instrumented hot-path sections.", ["span"]
+)
+
+# Per-request span totals (seconds), set by MetricsMiddleware. Starlette copies
+# the context into threadpool workers, so sync endpoints add to the same dict.
+_request_spans: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + elapsed
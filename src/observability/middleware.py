@@ -0,0 +1,112 @@
+"""
+ASGI middleware: per-endpoint latency histograms, a Server-Timing header with
+the request's span breakdown, and an opt-in per-request sampling profile.
+
+    app.add_middleware(MetricsMiddleware, profile_token=os.getenv("PROFILE_TOKEN"))
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+Profiling is off unless a token is configured; a request carrying
+`X-Profile: <token>` is then sampled and its folded stacks are written to
+`profile_dir`, with the file name returned in `X-Profile-File`. The sampler
+sees every thread in the process, so under concurrent traffic the profile
+also contains other requests' stacks; profile on an otherwise idle instance.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+import secrets
+import time
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+from .metrics import CONTENT_TYPE, REGISTRY, Registry, _request_spans
+from .profiler import SamplingProfiler
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    ["method", "route", "status"],
+)
+
+
+def _route_label(scope) -> str:
+    """Route template for the histogram label; raw paths would explode cardinality.
+
+    FastAPI routes put themselves in scope["route"]; plain Starlette routes
+    (e.g. `app.add_route("/metrics", ...)`) and short-circuited requests don't,
+    so fall back to matching the app's routes against the request.
+    """
+    route = scope.get("route")
+    if route is None:
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match is not Match.NONE:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, profile_token: Optional[str] = None, profile_dir: str = "profiles"):
+        self.app = app
+        self.profile_token = profile_token
+        self.profile_dir = Path(profile_dir)
+
+    def _profile_requested(self, scope) -> bool:
+        if not self.profile_token:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                return secrets.compare_digest(value, self.profile_token.encode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        spans = {}
+        token = _request_spans.set(spans)
+        profiler = profile_path = None
+        if self._profile_requested(scope):
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.folded"
+            profile_path = self.profile_dir / name
+            profiler = SamplingProfiler().start()
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = [f"{k};dur={v * 1000:.3f}" for k, v in spans.items()]
+                timing.append(f"total;dur={(time.perf_counter() - start) * 1000:.3f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(timing).encode("latin-1")))
+                if profile_path is not None:
+                    headers.append((b"x-profile-file", profile_path.name.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                await run_in_threadpool(profiler.write, profile_path)
+            REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                    method=scope["method"], route=_route_label(scope), status=str(status))
+
+
+def metrics_response(registry: Registry = REGISTRY) -> Response:
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Starlette endpoint serving the default registry."""
+    return metrics_response()
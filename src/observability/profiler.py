@@ -0,0 +1,68 @@
+"""
+Minimal sampling profiler for one-off request profiles.
+
+A background thread snapshots every thread's Python stack at a fixed
+interval (sys._current_frames), so work that sync endpoints run in the
+threadpool is captured too. Nothing ties a sample to a request: whatever
+else the process runs while profiling lands in the same profile. Output is
+the "folded" format (`frame;frame;frame count` per line) read by
+flamegraph.pl, speedscope and similar tools.
+"""
+from __future__ import annotations
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+import os
+import sys
+import threading
+
+# Leaf frames in these stdlib modules are threads waiting for work, not doing it.
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        me = threading.get_ident()
+        for tid, frame in sys._current_frames().items():
+            if tid == me or os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def write(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.folded(), encoding="utf-8")
@@ -0,0 +1,14 @@
+import atexit, os, shutil, sys, tempfile
+
+# Keep backend state (SQLite DB, retriever index, embeddings) out of the working tree.
+# Set at import time, before any test module imports backend.*.
+_TMP = tempfile.mkdtemp(prefix="ai-portfolio-tests-")
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+os.environ.setdefault("APP_DB_PATH", os.path.join(_TMP, "app_data.db"))
+os.environ.setdefault("QA_INDEX_DIR", os.path.join(_TMP, "qa_index"))
+os.environ.setdefault("QA_EMBED_CACHE_DIR", os.path.join(_TMP, "embedding_cache"))
+os.environ.setdefault("PDF_PAGE_CACHE_DIR", os.path.join(_TMP, "pdf_page_cache"))
+os.environ.setdefault("EMBED_BACKEND", "hashing")
+os.environ.setdefault("QA_BUILD_WORKERS", "1")
+os.environ.setdefault("QA_STARTUP", "blocking")  # indexes loaded before the first request
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
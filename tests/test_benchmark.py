@@ -0,0 +1,38 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+import benchmark
+
+def _result(**values):
+    return {"metrics": {name: benchmark.metric(v, "x", name.endswith("qps")) for name, v in values.items()}}
+
+def test_compare_flags_regressions_in_the_right_direction():
+    base = _result(query_qps=100.0, build_s=10.0)
+    rows = benchmark.compare(base, _result(query_qps=80.0, build_s=10.5), threshold=0.1)
+    assert {r["metric"]: r["regressed"] for r in rows} == {"query_qps": True, "build_s": False}
+    rows = benchmark.compare(base, _result(query_qps=150.0, build_s=12.0), threshold=0.1)
+    assert {r["metric"]: r["regressed"] for r in rows} == {"query_qps": False, "build_s": True}
+
+def test_run_tiny_suite_and_gate_on_baseline(tmp_path):
+    out = tmp_path / "bench.json"
+    args = ["run", "--size", "tiny", "--suites", "normalize,build,query", "--out", str(out)]
+    assert benchmark.main(args) == 0
+    metrics = benchmark.json.loads(out.read_text())["metrics"]
+    assert metrics["retriever.build_chunks_per_s"]["value"] > 0
+    assert benchmark.main(["compare", str(out), str(out)]) == 0
+
+def test_run_ignores_exported_state_paths_unless_state_dir_is_given(tmp_path, monkeypatch):
+    real = tmp_path / "real"
+    for key, value in benchmark.state_env(real).items():
+        monkeypatch.setenv(key, value)
+    seen = []
+    monkeypatch.setattr(benchmark, "bench_normalize", lambda cfg, work: seen.append(
+        (work, {k: os.environ[k] for k in benchmark.state_env(real)})) or {})
+    cfg = dict(benchmark.SIZES["tiny"])
+
+    benchmark.run(cfg, ["normalize"], 1)
+    work, env = seen[-1]
+    assert env == benchmark.state_env(work)
+    assert os.environ["APP_DB_PATH"] == str(real / "app.db")  # restored afterwards
+
+    benchmark.run(cfg, ["normalize"], 1, state_dir=tmp_path / "kept")
+    assert seen[-1][1] == benchmark.state_env(tmp_path / "kept")
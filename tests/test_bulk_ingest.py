@@ -0,0 +1,29 @@
+import os, sys, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from backend.database import Base
+from backend.fts import ensure_fts
+from backend import crud, models
+
+def test_upsert_bulk_inserts_pages_and_offset_chunks():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 't.db')}")
+        Base.metadata.create_all(bind=engine)
+        ensure_fts(engine)
+        db = sessionmaker(bind=engine)()
+
+        pages = [f"Page {i} intro.\n\n" + "lorem ipsum " * 120 for i in range(1200)]
+        doc = crud.upsert_document_with_pages(db, "big.pdf", "b" * 64, pages)
+        assert doc.num_pages == 1200
+        assert db.scalar(select(func.count()).select_from(models.Page)) == 1200
+
+        page = db.execute(select(models.Page).where(models.Page.page_number == 7)).scalar_one()
+        chunks = sorted(page.chunks, key=lambda c: c.chunk_index)
+        assert len(chunks) > 1
+        assert all(c.text == page.text[c.start_char:c.end_char] for c in chunks)
+        assert all(len(c.text) <= 800 for c in chunks)
+
+        hits, _ = crud.search_chunks(db, "intro", limit=5)
+        assert len(hits) == 5
+        db.close()
@@ -0,0 +1,83 @@
+import os, sys, tempfile, threading, time
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from backend.corpora import CorpusRegistry, parse_corpora
+
+def test_parse_corpora():
+    assert parse_corpora("a=/x, b = y") == {"a": Path("/x"), "b": Path("y")}
+    assert parse_corpora("") == {}
+
+def test_rebuild_swaps_index_without_touching_in_flight_reader():
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp) / "docs"
+        data.mkdir()
+        (data / "a.txt").write_text("Cats are wonderful animals that sleep a lot during the day.")
+        reg = CorpusRegistry(Path(tmp) / "index")
+        reg.register("pets", data)
+        assert reg.build("pets") == 1
+        old = reg.get("pets")
+
+        (data / "b.txt").write_text("Dogs are loyal companions who enjoy long walks in the park.")
+        assert reg.rebuild_async("pets")
+        deadline = time.time() + 30
+        while reg.status()["pets"]["building"] and time.time() < deadline:
+            time.sleep(0.05)
+
+        new = reg.get("pets")
+        assert new is not old
+        assert len(old.chunks) == 1 and old.query("dogs") == []
+        assert new.query("dogs", top_k=1)[0][0].doc_id == "b.txt#c0"
+        assert reg.status()["pets"]["stats"]["reused"] == 1
+
+def test_builds_of_one_corpus_never_overlap():
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp) / "docs"
+        data.mkdir()
+        (data / "a.txt").write_text("Cats are wonderful animals that sleep a lot during the day.")
+        reg = CorpusRegistry(Path(tmp) / "index")
+        reg.register("pets", data)
+        active, overlaps = [], []
+        new_retriever = reg._new_retriever
+
+        def tracked(name):
+            r = new_retriever(name)
+            build = r.build
+
+            def slow_build(*args):
+                overlaps.append(len(active))
+                active.append(name)
+                time.sleep(0.2)
+                try:
+                    return build(*args)
+                finally:
+                    active.remove(name)
+            r.build = slow_build
+            return r
+
+        reg._new_retriever = tracked
+        threads = [threading.Thread(target=reg.build, args=("pets",)) for _ in range(2)]
+        for t in threads:
+            t.start()
+        while not active:
+            time.sleep(0.01)
+        assert not reg.rebuild_async("pets")  # already building
+        for t in threads:
+            t.join()
+        assert overlaps == [0, 0]
+        assert not reg.status()["pets"]["building"]
+
+def test_rebuild_endpoint_is_disabled_without_admin_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend.app import app
+    from backend import qa
+    with TestClient(app) as client:
+        url = f"/qa/corpora/{qa.DEFAULT_CORPUS}/rebuild"
+        monkeypatch.setattr(qa, "ADMIN_TOKEN", None)
+        assert client.post(url).status_code == 403
+        assert client.post(url, headers={"X-Admin-Token": ""}).status_code == 403
+        monkeypatch.setattr(qa, "ADMIN_TOKEN", "s3cret")
+        assert client.post(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.post(url, headers={"X-Admin-Token": "s3cret"}).status_code == 202
+        deadline = time.time() + 30
+        while qa.corpora.status()[qa.DEFAULT_CORPUS]["building"] and time.time() < deadline:
+            time.sleep(0.05)
@@ -10,3 +10,16 @@ def test_load_csv_reads_rows():
         assert list(df.columns) == ["a","b"]
     finally:
         os.unlink(p.name)
+
+def test_iter_csv_row_texts_match_row_wise_format():
+    from ingestion import iter_csv, row_texts
+    p = tempfile.NamedTemporaryFile(delete=False, suffix=".csv", mode="w")
+    try:
+        p.write("a,b,c\n1,x,\n2,y,z\n3,w,v\n"); p.close()
+        parts = list(iter_csv(p.name, chunksize=2))
+        assert [len(df) for df in parts] == [2, 1]
+        texts = [t for df in parts for t in row_texts(df)]
+        assert texts == ["a: 1 | b: x | c: nan", "a: 2 | b: y | c: z", "a: 3 | b: w | c: v"]
+        assert row_texts(parts[0], columns=["b"]).tolist() == ["b: x", "b: y"]
+    finally:
+        os.unlink(p.name)
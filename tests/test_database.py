@@ -0,0 +1,84 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from backend import crud, database
+from backend.app import app
+from backend.database import ReadSessionLocal, SessionLocal
+
+def test_read_sessions_are_query_only_and_share_pragmas():
+    with TestClient(app):  # lifespan creates the schema
+        pass
+    reader = ReadSessionLocal()
+    try:
+        assert reader.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert reader.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        with pytest.raises(OperationalError):
+            reader.execute(text("INSERT INTO documents (filename, sha256, num_pages) VALUES ('x', 'y', 0)"))
+    finally:
+        reader.close()
+
+def test_readers_do_not_wait_for_an_open_write_transaction():
+    with TestClient(app):
+        pass
+    writer, reader = SessionLocal(), ReadSessionLocal()
+    try:
+        before = crud.documents_version(reader)
+        reader.rollback()
+        crud.create_document(writer, "pending.pdf", "p" * 64, 1)  # flushed, holds the write lock
+        assert crud.documents_version(reader) == before
+        writer.commit()
+        reader.rollback()
+        assert crud.documents_version(reader) > before
+    finally:
+        writer.close()
+        reader.close()
+
+def test_async_read_path(monkeypatch):
+    monkeypatch.setattr(database, "DB_ASYNC", True)
+    with TestClient(app) as client:
+        db = SessionLocal()
+        try:
+            doc = crud.upsert_document_with_pages(db, "async.pdf", "a" * 64, ["an asyncreadpath page"])
+        finally:
+            db.close()
+        assert any(d["id"] == doc.id for d in client.get("/documents", params={"limit": 500}).json())
+        detail = client.get(f"/documents/{doc.id}", params={"include_chunks": True}).json()
+        assert detail["pages"][0]["chunks"]
+        hits = client.get("/search", params={"q": "asyncreadpath"}).json()["hits"]
+        assert [h["document_id"] for h in hits] == [doc.id]
+
+def test_writer_waits_long_enough_to_queue_behind_bulk_inserts():
+    import subprocess
+    assert database.engine.pool.timeout() == 300
+    assert database.read_engine.pool.timeout() == database.READ_TIMEOUT
+    env = {**os.environ, "APP_DB_WRITE_TIMEOUT": "12.5"}
+    out = subprocess.run([sys.executable, "-c", "from backend.database import engine; print(engine.pool.timeout())"],
+                         cwd=os.path.join(os.path.dirname(__file__), ".."), env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert float(out) == 12.5
+
+def test_concurrent_writers_queue_for_the_single_connection(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy.orm import sessionmaker
+    from backend.database import Base
+    from backend.fts import ensure_fts
+
+    eng = database._sync_engine(read_only=False, url=f"sqlite:///{tmp_path / 'w.db'}")
+    Base.metadata.create_all(bind=eng)
+    ensure_fts(eng)
+    Session = sessionmaker(bind=eng)
+
+    def ingest(i):
+        db = Session()
+        try:
+            pages = [f"page {j} of document {i} " * 40 for j in range(200)]
+            return crud.upsert_document_with_pages(db, f"{i}.pdf", f"{i:064d}", pages).id
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(6) as pool:
+        ids = list(pool.map(ingest, range(6)))
+    assert len(set(ids)) == 6
@@ -0,0 +1,46 @@
+import os, sys
+from contextlib import contextmanager
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from backend.app import app
+from backend.database import SessionLocal, read_engine
+from backend import crud
+
+@contextmanager
+def _count_queries():
+    seen = []
+    listener = lambda *args: seen.append(args[2])
+    event.listen(read_engine, "before_cursor_execute", listener)
+    try:
+        yield seen
+    finally:
+        event.remove(read_engine, "before_cursor_execute", listener)
+
+def _make_doc(n_pages: int) -> int:
+    db = SessionLocal()
+    try:
+        pages = [f"Page {i} heading.\n\n" + "detail text " * 100 for i in range(n_pages)]
+        return crud.upsert_document_with_pages(db, "detail.pdf", "d" * 64, pages).id
+    finally:
+        db.close()
+
+def test_document_detail_uses_fixed_query_count():
+    with TestClient(app) as client:
+        doc_id = _make_doc(40)
+        with _count_queries() as seen:
+            res = client.get(f"/documents/{doc_id}", params={"include_chunks": True})
+        pages = res.json()["pages"]
+        assert len(pages) == 40 and all(p["text"] and p["chunks"] for p in pages)
+        assert [sql.split("FROM ")[1].split()[0] for sql in seen] == ["documents", "pages", "chunks"]
+
+        lean = client.get(f"/documents/{doc_id}", params={"include_text": False}).json()
+        assert all(p["text"] is None and p["chunks"] == [] for p in lean["pages"])
+
+        first = client.get(f"/documents/{doc_id}/pages", params={"limit": 10}).json()
+        assert [p["page_number"] for p in first] == list(range(1, 11))
+        nxt = client.get(f"/documents/{doc_id}/pages", params={"limit": 10, "after": 10}).json()
+        assert nxt[0]["page_number"] == 11
+
+        chunks = client.get(f"/pages/{first[0]['id']}/chunks", params={"limit": 1}).json()
+        assert chunks[0]["chunk_index"] == 0
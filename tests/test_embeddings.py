@@ -0,0 +1,37 @@
+import os, sys, tempfile
+from pathlib import Path
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from nlp.embeddings import EmbeddingCache, HashingEmbedder, VectorIndex
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.encoded = 0
+    def encode(self, texts, batch_size=64):
+        self.encoded += len(texts)
+        return super().encode(texts, batch_size)
+
+def test_cache_only_embeds_unseen_texts_and_persists():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb = CountingEmbedder()
+        cache = EmbeddingCache(Path(tmp), emb)
+        first = cache.embed(["alpha beta", "gamma delta", "alpha beta"])
+        assert emb.encoded == 2
+        assert first.dtype == np.float32 and first.shape == (3, 64)
+        assert np.allclose(first[0], first[2])
+
+        reopened = EmbeddingCache(Path(tmp), emb)
+        again = reopened.embed(["gamma delta", "epsilon"])
+        assert emb.encoded == 3
+        assert np.allclose(again[0], first[1])
+        assert len(reopened) == 3
+
+def test_vector_index_exact_top_k_with_candidates():
+    emb = HashingEmbedder(dim=128)
+    texts = ["cats sleep all day", "stock market rally", "dogs walk in the park", "cats and dogs"]
+    index = VectorIndex(emb.encode(texts))
+    ids, scores = index.search(emb.encode(["cats"]), top_k=2)[0]
+    assert set(ids) == {0, 3} and scores[0] >= scores[1]
+    ids, _ = index.search(emb.encode(["cats"]), top_k=5, candidates=np.array([1, 2, 3]))[0]
+    assert ids[0] == 3 and len(ids) == 3
@@ -0,0 +1,36 @@
+import os, sys, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from backend.highlight import highlight, query_pattern
+
+def test_marks_case_insensitively_escapes_and_never_nests():
+    out = highlight("An Invoice <b>for</b> voice INVOICES", "invoice voice?")
+    assert out == ("An <mark>Invoice</mark> &lt;b&gt;for&lt;/b&gt; <mark>voice</mark> "
+                   "<mark>INVOICE</mark>S")
+    assert "<mark><mark>" not in out
+
+def test_window_is_centered_on_densest_match_not_prefix():
+    text = "filler words here. " * 60 + "The refund policy covers refund requests." + " more filler." * 60
+    out = highlight(text, "refund policy", max_chars=120)
+    assert out.startswith("…") and out.endswith("…")
+    assert out.count("<mark>") == 3
+    assert len(out.replace("<mark>", "").replace("</mark>", "")) <= 122
+
+def test_multiple_fragments_from_long_text():
+    text = "alpha target one. " + "padding " * 200 + "beta target two. " + "padding " * 200
+    out = highlight(text, "target", max_chars=120, fragments=2)
+    assert out.count("<mark>target</mark>") == 2
+    assert "alpha" in out and "beta" in out
+
+def test_whole_word_prefix_terms_for_search():
+    pat = query_pattern('inv* "big dog"', min_len=1, whole_words=True)
+    assert [m.group() for m in pat.finditer("invoices bigger big dog")] == ["invoices", "big", "dog"]
+
+def test_search_pages_fragments():
+    from test_search_pages import _session
+    from backend import crud
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _session(os.path.join(tmp, "t.db"))
+        page = "invoice start. " + "lorem ipsum " * 100 + "final invoice total."
+        crud.upsert_document_with_pages(db, "a.pdf", "b" * 64, [page])
+        hits, _ = crud.search_pages(db, "invoice", fragments=2)
+        assert hits[0]["snippet"].count("<mark>invoice</mark>") == 2
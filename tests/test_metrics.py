@@ -0,0 +1,51 @@
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app import app
+from src.observability import MetricsMiddleware, Registry, span
+
+def test_qa_reports_spans_and_route_histograms():
+    with TestClient(app) as client:
+        res = client.post("/qa", json={"question": "hello ingestion", "mode": "lexical"})
+        assert res.status_code == 200
+        timing = res.headers["server-timing"]
+        assert "tfidf_transform;dur=" in timing and "similarity_scoring;dur=" in timing and "total;dur=" in timing
+
+        body = client.get("/metrics").text
+        assert 'http_request_duration_seconds_count{method="POST",route="/qa",status="200"}' in body
+        assert 'span_duration_seconds_bucket{span="highlight",le="+Inf"}' in body
+
+        client.get("/no-such-page")
+        body = client.get("/metrics").text
+        assert 'http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in body
+        assert 'route="<unmatched>",status="404"' in body
+
+def test_histogram_render_is_cumulative():
+    reg = Registry()
+    h = reg.histogram("x_seconds", "test", ["op"], buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v, op="a")
+    out = reg.render()
+    assert 'x_seconds_bucket{op="a",le="0.1"} 1' in out
+    assert 'x_seconds_bucket{op="a",le="1"} 2' in out
+    assert 'x_seconds_bucket{op="a",le="+Inf"} 3' in out
+    assert 'x_seconds_count{op="a"} 3' in out
+
+def test_profile_header_writes_folded_stacks(tmp_path):
+    mini = FastAPI()
+
+    @mini.get("/slow")
+    def slow():
+        with span("work"):
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                sum(range(1000))
+        return {"ok": True}
+
+    mini.add_middleware(MetricsMiddleware, profile_token="secret", profile_dir=str(tmp_path))
+    client = TestClient(mini)
+    assert "x-profile-file" not in client.get("/slow", headers={"X-Profile": "wrong"}).headers
+    res = client.get("/slow", headers={"X-Profile": "secret"})
+    folded = (tmp_path / res.headers["x-profile-file"]).read_text()
+    assert "slow (test_metrics.py" in folded  # threadpool work is sampled
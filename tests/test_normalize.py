@@ -0,0 +1,32 @@
+import os, random, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from ingestion import normalize_stream, normalize_text
+
+def _reference(text: str) -> str:
+    """The original multi-pass normalize_text, kept as the oracle."""
+    if not text:
+        return ""
+    text = text.lstrip("﻿")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return text.rstrip("\n")
+
+# Line breaks, ASCII/Unicode whitespace that rstrip() removes, BOMs, and word characters.
+ALPHABET = ["a", "é", "x y", " ", "\t", "\r", "\n", "\r\n", "﻿", "\x0b", "\x0c", "\x1c", "\x85",
+            "\xa0", " ", "　", "​"]
+
+def _random_texts(n: int, seed: int = 1234):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+
+def test_normalize_text_matches_reference():
+    for text in _random_texts(5000):
+        assert normalize_text(text) == _reference(text), repr(text)
+
+def test_normalize_stream_matches_reference_for_any_split():
+    rng = random.Random(99)
+    for text in _random_texts(2000):
+        cuts = sorted(rng.sample(range(len(text) + 1), k=min(3, len(text) + 1)))
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert "".join(normalize_stream(pieces)) == _reference(text), (text, pieces)
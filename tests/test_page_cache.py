@@ -0,0 +1,80 @@
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import pdfplumber
+import pytest
+from reportlab.pdfgen import canvas
+from backend.retriever import SimpleRetriever
+from src.ingestion import page_cache
+from src.ingestion.page_cache import PageCache
+from src.ingestion.pdf_loader import extract_pdf_pages, iter_pdf_pages
+
+def _pdf(path, pages):
+    c = canvas.Canvas(str(path))
+    for text in pages:
+        c.drawString(72, 720, text)
+        c.showPage()
+    c.save()
+    return path
+
+def _forbid_pdfplumber(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("pdfplumber.open called on a cached PDF")
+    monkeypatch.setattr(pdfplumber, "open", fail)
+
+def test_identical_pages_are_stored_once_and_evicted_lru(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / "pages.sqlite"), max_bytes=10_000)
+    cache.put_many("a" * 64, {0: "Cover page", 1: "alpha " * 50})
+    cache.put_many("b" * 64, {0: "Cover page", 1: "beta " * 50})
+    assert cache.get_many("b" * 64, [0, 1, 2]) == {0: "Cover page", 1: "beta " * 50}
+    assert cache.stats()["pages"] == 4 and cache.stats()["texts"] == 3
+
+    clock = iter(range(1, 100))
+    monkeypatch.setattr(page_cache, "_now_ms", lambda: next(clock) * 3_600_000)  # hours apart: every hit touches
+    texts = {sha: os.urandom(100).hex() for sha in ("a" * 64, "b" * 64, "c" * 64)}  # barely compressible
+    small = PageCache(str(tmp_path / "small.sqlite"))
+    small.put_many("a" * 64, {0: texts["a" * 64]})
+    small.max_bytes = int(small.stats()["bytes"] * 2.5)  # room for two pages
+    small.put_many("b" * 64, {0: texts["b" * 64]})
+    small.get_many("a" * 64, [0])  # a is now more recent than b
+    small.put_many("c" * 64, {0: texts["c" * 64]})
+    assert small.get_many("b" * 64, [0]) == {}
+    assert small.get_many("a" * 64, [0]) and small.get_many("c" * 64, [0])
+    assert small.stats()["bytes"] <= small.max_bytes
+
+def test_cache_is_reset_when_the_extractor_changes(tmp_path, monkeypatch):
+    PageCache(str(tmp_path / "p.sqlite")).put_many("a" * 64, {0: "text"})
+    monkeypatch.setattr(page_cache, "_extractor", lambda: "pdfplumber-0.0")
+    assert PageCache(str(tmp_path / "p.sqlite")).get_many("a" * 64, [0]) == {}
+
+def test_second_extraction_and_retriever_build_skip_pdfplumber(tmp_path, monkeypatch):
+    data = tmp_path / "corpus"
+    data.mkdir()
+    pdf = _pdf(data / "doc.pdf", ["page one about caching extracted text", "page two about shared caches"])
+    assert [t.strip() for t in extract_pdf_pages(str(pdf))] == [
+        "page one about caching extracted text", "page two about shared caches"]
+
+    _forbid_pdfplumber(monkeypatch)
+    assert list(iter_pdf_pages(str(pdf))) == ["page one about caching extracted text", "page two about shared caches"]
+    r = SimpleRetriever(data)
+    assert r.build() == 2
+    assert r.query("shared caches", top_k=1)[0][0].meta["page"] == 1
+
+def test_use_cache_false_always_parses(tmp_path, monkeypatch):
+    pdf = _pdf(tmp_path / "x.pdf", ["uncached page"])
+    extract_pdf_pages(str(pdf))
+    _forbid_pdfplumber(monkeypatch)
+    with pytest.raises(AssertionError):
+        extract_pdf_pages(str(pdf), use_cache=False)
+
+def test_hits_within_the_touch_interval_do_not_write(tmp_path, monkeypatch):
+    now = [1_000_000]
+    monkeypatch.setattr(page_cache, "_now_ms", lambda: now[0])
+    cache = PageCache(str(tmp_path / "t.sqlite"), touch_seconds=60)
+    cache.put_many("a" * 64, {0: "zero", 1: "one"})
+    writes = cache._db.total_changes
+    now[0] += 30_000
+    assert cache.get_many("a" * 64, [0, 1]) == {0: "zero", 1: "one"}
+    assert cache._db.total_changes == writes  # read-only
+    now[0] += 31_000
+    assert cache.get_many("a" * 64, [1]) == {1: "one"}
+    assert cache._db.total_changes == writes + 1  # only the text that was read
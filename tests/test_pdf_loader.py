@@ -0,0 +1,22 @@
+import os, sys, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from reportlab.pdfgen import canvas
+from ingestion import iter_pdf_pages, load_pdf
+
+def test_iter_pdf_pages_yields_each_page_lazily():
+    p = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    p.close()
+    try:
+        c = canvas.Canvas(p.name)
+        c.drawString(72, 720, "first page   ")
+        c.showPage()
+        c.showPage()  # blank page
+        c.drawString(72, 720, "third page")
+        c.showPage()
+        c.save()
+        pages = iter_pdf_pages(p.name)
+        assert next(pages) == "first page"
+        assert list(pages) == ["", "third page"]
+        assert load_pdf(p.name) == "first page\nthird page"
+    finally:
+        os.unlink(p.name)
@@ -0,0 +1,78 @@
+import asyncio, json, os, sys
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.background import BackgroundTask
+from backend.app import app
+from backend.batch import aiter_lines
+from backend.qa import _BodyStreamingResponse
+from backend.retriever import SimpleRetriever
+from scripts import qa_batch
+
+def test_batch_endpoint_streams_one_result_per_line_in_order():
+    lines = [
+        json.dumps({"id": "q1", "question": "hello ingestion"}),
+        "{not json",
+        "",
+        json.dumps("what is ingestion?"),
+        json.dumps({"id": "q4", "question": "x"}),
+    ]
+    with TestClient(app) as client:
+        r = client.post("/qa/batch", params={"batch_size": 2, "top_k": 2, "text": True, "highlight": True},
+                        content="\n".join(lines).encode())
+        assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(l) for l in r.text.splitlines()]
+        assert [row["id"] for row in rows] == ["q1", 2, 4, "q4"]
+        assert "invalid JSON" in rows[1]["error"] and "too short" in rows[3]["error"]
+
+        single = client.post("/qa", json={"question": "hello ingestion", "top_k": 2}).json()
+        assert single["mode"] == "lexical"  # the default, as for /qa/batch: cosine scores
+        assert [(a["doc_id"], a["score"]) for a in rows[0]["answers"]] == \
+            [(a["doc_id"], a["score"]) for a in single["answers"]]
+        assert all("text" in a and "highlighted" in a for a in rows[0]["answers"])
+
+        assert client.post("/qa/batch", params={"corpus": "nope"}, content=b"").status_code == 404
+
+def test_body_streaming_response_runs_background_task():
+    mini, done = FastAPI(), []
+
+    @mini.post("/echo")
+    async def echo(request: Request):
+        return _BodyStreamingResponse(request.stream(), background=BackgroundTask(done.append, "ran"))
+
+    assert TestClient(mini).post("/echo", content=b"abc").content == b"abc"
+    assert done == ["ran"]
+
+def test_query_many_matches_query():
+    r = SimpleRetriever(Path(__file__).parent.parent / "sample_data")
+    r.build()
+    questions = ["hello ingestion", "zzzunknownterm", "sample data pipeline"]
+    for q, hits in zip(questions, r.query_many(questions, top_k=3)):
+        assert [(c.doc_id, round(s, 9)) for c, s in hits] == [(c.doc_id, round(s, 9)) for c, s in r.query(q, top_k=3)]
+
+def test_aiter_lines_handles_split_utf8_and_overlong_lines():
+    async def chunks():
+        for c in [b"caf\xc3", b"\xa9\nab", b"cdefgh", b"ij\nlast"]:
+            yield c
+
+    async def collect():
+        return [line async for line in aiter_lines(chunks(), max_chars=4)]
+
+    assert asyncio.run(collect()) == ["café", "abcd", "last"]
+
+def test_cli_writes_ndjson(tmp_path, capsys):
+    data = tmp_path / "docs"
+    data.mkdir()
+    (data / "a.txt").write_text("Cats are wonderful animals that sleep a lot during the day.")
+    (data / "b.txt").write_text("Dogs are loyal companions who enjoy long walks in the park.")
+    src = tmp_path / "q.jsonl"
+    src.write_text('{"request_id": "r1", "title": "Which animals enjoy walks?"}\n"sleeping cats"\n')
+    out = tmp_path / "out.jsonl"
+    assert qa_batch.main([str(src), "--data-dir", str(data), "--field", "title", "--id-field", "request_id",
+                          "--top-k", "1", "--highlight", "--out", str(out)]) == 0
+    rows = [json.loads(l) for l in out.read_text().splitlines()]
+    assert [(row["id"], row["answers"][0]["source_path"].endswith(name)) for row, name in zip(rows, ["b.txt", "a.txt"])] \
+        == [("r1", True), (2, True)]
+    assert "<mark>" in rows[0]["answers"][0]["highlighted"]
+    assert "2 lines (0 errors)" in capsys.readouterr().err
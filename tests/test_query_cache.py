@@ -0,0 +1,55 @@
+import os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi.testclient import TestClient
+from backend.app import app, search_cache
+from backend.cache import QueryCache
+from backend.database import SessionLocal
+from backend import crud, qa
+
+def test_lru_bounds_entries_bytes_and_ttl():
+    c = QueryCache("test-lru", max_entries=2, max_bytes=100, ttl=60)
+    c.put("a", 1, 10); c.put("b", 2, 10)
+    assert c.get("a") == 1          # a is now most recent
+    c.put("c", 3, 10)               # evicts b
+    assert c.get("b") is None and c.get("c") == 3
+    c.put("big", 4, 95)             # byte budget evicts everything older
+    assert len(c) == 1 and c.get("big") == 4
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+    short = QueryCache("test-ttl", ttl=0.01)
+    short.put("k", "v", 1)
+    time.sleep(0.03)
+    assert short.get("k") is None and len(short) == 0
+
+def test_search_cache_hits_and_is_invalidated_by_new_documents():
+    with TestClient(app) as client:
+        before = search_cache.stats()["hits"]
+        assert client.get("/search", params={"q": "zebracachetest"}).json()["hits"] == []
+        assert client.get("/search", params={"q": "  ZebraCacheTest "}).json()["hits"] == []
+        assert search_cache.stats()["hits"] == before + 1
+
+        db = SessionLocal()
+        try:
+            crud.upsert_document_with_pages(db, "z.pdf", "c" * 64, ["a zebracachetest page"])
+        finally:
+            db.close()
+        hits = client.get("/search", params={"q": "zebracachetest"}).json()["hits"]
+        assert [h["page_number"] for h in hits] == [1]
+
+def test_qa_cache_is_invalidated_by_rebuild():
+    with TestClient(app) as client:
+        body = {"question": "hello ingestion", "mode": "lexical", "top_k": 2}
+        first = client.post("/qa", json=body).json()
+        second = client.post("/qa", json={**body, "question": "Hello   INGESTION"}).json()
+        assert not first["cached"] and second["cached"]
+        assert second["question"] == "Hello   INGESTION"
+        assert second["answers"] == first["answers"]
+
+        qa.corpora.build(qa.DEFAULT_CORPUS)
+        assert not client.post("/qa", json=body).json()["cached"]
+
+def test_qa_question_without_known_terms_has_no_answers():
+    with TestClient(app) as client:
+        res = client.post("/qa", json={"question": "unknownword zzzqqq", "mode": "lexical"})
+        assert res.status_code == 200 and res.json()["answers"] == []
@@ -0,0 +1,118 @@
+import os, signal, sys, tempfile, threading, time
+import pytest
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from backend.retriever import SimpleRetriever
+
+def _write(d: Path, name: str, text: str):
+    (d / name).write_text(text, encoding="utf-8")
+
+def test_persisted_index_only_reparses_changed_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        _write(d, "a.txt", "Cats are wonderful animals that sleep a lot during the day.")
+        _write(d, "b.txt", "The stock market rallied today as investors cheered earnings.")
+        index = d / "idx.npz"
+
+        r1 = SimpleRetriever(d, index_path=index)
+        assert r1.build() == 2
+        assert r1.build_stats["reparsed"] == 2
+        first = [(c.doc_id, round(s, 6)) for c, s in r1.query("stock market", top_k=2)]
+
+        r2 = SimpleRetriever(d, index_path=index)
+        assert r2.build() == 2
+        assert r2.build_stats == {"files": 2, "reparsed": 0, "reused": 2, "removed": 0, "errors": []}
+        assert [(c.doc_id, round(s, 6)) for c, s in r2.query("stock market", top_k=2)] == first
+
+        _write(d, "b.txt", "Dogs are loyal companions who enjoy long walks in the park.")
+        os.utime(d / "b.txt", ns=(0, 0))
+        r3 = SimpleRetriever(d, index_path=index)
+        r3.build()
+        assert r3.build_stats["reparsed"] == 1
+        assert r3.query("dogs park", top_k=1)[0][0].doc_id == "b.txt#c0"
+
+def test_workers_map_shared_flat_snapshot():
+    import numpy as np
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        _write(d, "a.txt", "Cats are wonderful animals.\n\nThey sleep a lot during the day, like über-cats.")
+        _write(d, "b.csv", "name,notes\nrex,loyal dog who enjoys long walks\nfelix,cat that sleeps\n")
+        index = d / "idx.npz"
+
+        plain = SimpleRetriever(d)
+        plain.build()
+        built = SimpleRetriever(d, index_path=index)
+        built.build()
+        assert (d / "idx.flat").exists()
+
+        worker = SimpleRetriever(d, index_path=index)
+        worker.build()
+        assert np.shares_memory(worker._tfidf.data, worker._flat._mm)
+        assert list(worker.chunks) == list(plain.chunks)
+        for q in ["cats sleep", "über-cats", "loyal dog walks", "nothing-matches"]:
+            expected = [(c.doc_id, round(s, 5)) for c, s in plain.query(q, top_k=3)]
+            assert [(c.doc_id, round(s, 5)) for c, s in worker.query(q, top_k=3)] == expected
+
+def test_csv_columns_and_row_grouping():
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        rows = "".join(f"{i},note {i},secret{i}\n" for i in range(5))
+        _write(d, "t.csv", "id,notes,hidden\n" + rows)
+        r = SimpleRetriever(d, csv_columns=["id", "notes"], csv_rows_per_chunk=2, csv_chunksize=3)
+        assert r.build() == 3
+        assert [c.doc_id for c in r.chunks] == ["t.csv#r0", "t.csv#r2", "t.csv#r4"]
+        assert r.chunks[0].text == "id: 0 | notes: note 0\nid: 1 | notes: note 1"
+        assert r.chunks[0].meta["columns"] == ["id", "notes"]
+        assert "secret" not in " ".join(c.text for c in r.chunks)
+
+def test_parallel_recursive_build_matches_serial_and_reports_errors():
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        (d / "sub").mkdir()
+        _write(d, "a.txt", "Cats are wonderful animals that sleep a lot during the day.")
+        _write(d / "sub", "a.txt", "Dogs are loyal companions who enjoy long walks in the park.")
+        _write(d, "t.csv", "name,notes\nrex,loyal dog who enjoys long walks\nfelix,cat that sleeps\n")
+        _write(d, "broken.pdf", "not really a pdf")
+
+        serial = SimpleRetriever(d, recursive=True)
+        parallel = SimpleRetriever(d, recursive=True, workers=2, file_timeout=30)
+        seen = []
+        assert serial.build() == parallel.build(progress=lambda done, total, path: seen.append((done, total))) == 4
+        assert [c.doc_id for c in parallel.chunks] == [c.doc_id for c in serial.chunks]
+        assert "sub/a.txt#c0" in [c.doc_id for c in parallel.chunks]
+        assert seen == [(1, 4), (2, 4), (3, 4), (4, 4)]
+        errors = parallel.build_stats["errors"]
+        assert [Path(e["path"]).name for e in errors] == ["broken.pdf"]
+        assert parallel.query("dogs park", top_k=1)[0][0].doc_id == "sub/a.txt#c0"
+
+class SlowRetriever(SimpleRetriever):
+    """Hangs on b.txt (module level, so spawned workers can unpickle it)."""
+    block_alarm = False
+
+    def _load_txt(self, path, store):
+        if path.name == "b.txt":
+            if self.block_alarm:  # as if stuck in C code, where the worker's alarm cannot reach
+                signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+            time.sleep(60)
+        super()._load_txt(path, store)
+
+class StuckRetriever(SlowRetriever):
+    block_alarm = True
+
+@pytest.mark.parametrize("cls", [SlowRetriever, StuckRetriever])
+def test_file_timeout_skips_hanging_file_in_background_build(cls):
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        _write(d, "a.txt", "Cats are wonderful animals that sleep a lot during the day.")
+        _write(d, "b.txt", "Dogs are loyal companions who enjoy long walks in the park.")
+        _write(d, "c.txt", "The stock market rallied today as investors cheered earnings.")
+        r = cls(d, file_timeout=0.5)
+        result = []
+        builder = threading.Thread(target=lambda: result.append(r.build()))  # not the main thread
+        builder.start()
+        builder.join(timeout=60)
+        assert not builder.is_alive() and result == [2]
+        assert [c.doc_id for c in r.chunks] == ["a.txt#c0", "c.txt#c0"]
+        errors = r.build_stats["errors"]
+        assert [Path(e["path"]).name for e in errors] == ["b.txt"]
+        assert errors[0]["error"].startswith("TimeoutError")
@@ -0,0 +1,59 @@
+import os, sys, tempfile
+from pathlib import Path
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from backend.retriever import SimpleRetriever
+from src.nlp.tokenization import Chunker
+
+DOCS = [
+    "Cats are wonderful animals that sleep a lot during the day.",
+    "Dogs are loyal companions who enjoy long walks in the park.",
+    "The stock market rallied today as investors cheered earnings.",
+    "Cats and dogs were not involved in the market rally at all today.",
+    "Weather forecast: rain in the park tomorrow, sunny after that.",
+]
+ONE_PER_PARAGRAPH = Chunker(max_tokens=16)  # too small to pack two DOCS together
+
+def test_query_matches_brute_force_cosine():
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        (d / "docs.txt").write_text("\n\n".join(DOCS), encoding="utf-8")
+        r = SimpleRetriever(d, chunker=ONE_PER_PARAGRAPH)
+        assert r.build() == len(DOCS)
+        questions = ["cats dogs", "market today", "park", "unknownword"]
+
+        dense = r._tfidf.toarray()
+        batched = r.query_many(questions, top_k=3)
+        for q, hits in zip(questions, batched):
+            sims = dense @ r.vectorizer.transform([q]).toarray()[0]
+            expected = [i for i in np.argsort(-sims, kind="stable") if sims[i] > 0][:3]
+            assert [r.chunks.index(c) for c, _ in hits] == expected
+            assert np.allclose([s for _, s in hits], sims[expected])
+            assert r.query(q, top_k=3) == hits
+        assert batched[-1] == []
+        assert r.query("unknownword", top_k=3) == []  # no zero-score padding
+        assert len(r.query("park", top_k=5)) == 2  # only chunks sharing a term
+
+class ReverseReranker:
+    """Prefers longer texts, so re-ranking visibly reorders hits."""
+    def score(self, query, texts):
+        return np.array([len(t) for t in texts], dtype=float)
+
+def test_query_hybrid_fuses_stages_and_reports_timings():
+    from src.nlp.embeddings import HashingEmbedder
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        (d / "docs.txt").write_text("\n\n".join(DOCS), encoding="utf-8")
+        r = SimpleRetriever(d, embedder=HashingEmbedder(dim=256), chunker=ONE_PER_PARAGRAPH)
+        r.build()
+
+        hits, stats = r.query_hybrid("cats dogs", top_k=2, candidates=3)
+        assert len(hits) == 2
+        assert stats["budgets"] == {"lexical": 3, "dense": 3}
+        assert set(stats["timings_ms"]) == {"lexical", "dense", "fusion"}
+        assert all("cats" in c.text.lower() or "dogs" in c.text.lower() for c, _ in hits)
+        assert hits[0][1] >= hits[1][1]
+
+        reranked, stats = r.query_hybrid("cats dogs", top_k=2, reranker=ReverseReranker())
+        assert [len(c.text) for c, _ in reranked] == sorted((len(c.text) for c, _ in reranked), reverse=True)
+        assert stats["budgets"]["rerank"] == 2
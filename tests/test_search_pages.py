@@ -0,0 +1,38 @@
+import os, sys, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.database import Base
+from backend.fts import ensure_fts, to_match_query
+from backend import crud
+
+def _session(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    ensure_fts(engine)
+    return sessionmaker(bind=engine)()
+
+def test_to_match_query_quotes_terms_and_keeps_phrases_and_prefixes():
+    assert to_match_query('cat "big dog" inv* a-b') == '"cat" "big dog" "inv"* "a-b"'
+
+def test_search_pages_ranks_snippets_and_paginates():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _session(os.path.join(tmp, "t.db"))
+        crud.upsert_document_with_pages(db, "a.pdf", "a" * 64, [
+            "invoice invoice invoice total due",
+            "nothing relevant here",
+            "one invoice <b>line</b>",
+            "invoices are mentioned in plural",
+        ])
+        hits, cursor = crud.search_pages(db, "invoice", limit=1)
+        assert [h["page_number"] for h in hits] == [1]
+        assert "<mark>invoice</mark>" in hits[0]["snippet"]
+        hits2, cursor2 = crud.search_pages(db, "invoice", limit=5, cursor=cursor)
+        assert [h["page_number"] for h in hits2] == [3]
+        assert "&lt;b&gt;" in hits2[0]["snippet"]
+        assert cursor2 is None
+        prefixed, _ = crud.search_pages(db, "invoice*", limit=10)
+        assert {h["page_number"] for h in prefixed} == {1, 3, 4}
+        phrase, _ = crud.search_pages(db, '"total due"', limit=10)
+        assert [h["page_number"] for h in phrase] == [1]
+        db.close()
@@ -0,0 +1,43 @@
+import os, subprocess, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi.testclient import TestClient
+from backend.corpora import CorpusRegistry
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+# Generous for slow CI; a regression to eager sklearn/pandas imports roughly triples it.
+IMPORT_BUDGET_S = 2.0
+HEAVY = ("sklearn", "pandas", "pdfplumber", "scipy", "backend.retriever")
+
+def test_importing_app_is_cheap_and_side_effect_free(tmp_path):
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        "import backend.app\n"
+        "print(time.perf_counter() - t)\n"
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+    )
+    env = {**os.environ, "APP_DB_PATH": str(tmp_path / "app.db"), "QA_INDEX_DIR": str(tmp_path / "idx")}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout.splitlines()
+    seconds, loaded = float(out[0]), out[1] if len(out) > 1 else ""
+    assert loaded == ""
+    assert seconds < IMPORT_BUDGET_S
+    assert not (tmp_path / "app.db").exists() and not (tmp_path / "idx").exists()
+
+def test_registry_is_not_ready_until_every_corpus_is_built(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "x.txt").write_text("some text about readiness probes and startup")
+    reg = CorpusRegistry(tmp_path / "idx")
+    reg.register("a", tmp_path / "a")
+    assert not reg.ready()
+    reg.build("a")
+    assert reg.ready()
+
+def test_healthz_and_ready_after_startup():
+    from backend.app import app
+    with TestClient(app) as client:
+        assert client.get("/healthz").json() == {"status": "up"}
+        res = client.get("/ready")
+        assert res.status_code == 200
+        body = res.json()
+        assert body["status"] == "ready" and body["corpora"]["default"]["chunks"] > 0
@@ -9,3 +9,28 @@ def test_load_text_normalizes_newlines():
         assert out == "hello\nworld"
     finally:
         os.unlink(p.name)
+
+def test_iter_text_lines_matches_normalize_text():
+    from ingestion import iter_text_lines, normalize_text
+    samples = [b"", b"\n\n", b"\xef\xbb\xbfa  \r\nb\rc\n\n \n", b"a\n\n\nb\t\n\n", b"  x\r\r\ny  \n"]
+    for raw in samples:
+        p = tempfile.NamedTemporaryFile(delete=False, suffix=".txt")
+        try:
+            p.write(raw); p.close()
+            assert "\n".join(iter_text_lines(p.name)) == normalize_text(raw.decode("utf-8"))
+        finally:
+            os.unlink(p.name)
+
+def test_encoding_detected_from_prefix_and_decoded_incrementally():
+    from ingestion import iter_text_lines
+    from ingestion.utils import detect_encoding
+    p = tempfile.NamedTemporaryFile(delete=False, suffix=".txt")
+    try:
+        # ASCII-only sample, UTF-8 further in: must not be decoded as ASCII
+        p.write(b"plain line\n" * 20000 + "café naïve\n".encode("utf-8")); p.close()
+        assert detect_encoding(p.name, sample_bytes=1024) == "utf-8"
+        lines = iter_text_lines(p.name)
+        assert next(lines) == "plain line"
+        assert list(lines)[-1] == "café naïve"
+    finally:
+        os.unlink(p.name)
@@ -0,0 +1,55 @@
+import os, random, re, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import pytest
+from src.nlp.tokenization import Chunker, count_tokens
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+
+def _text(seed=1, paragraphs=200):
+    rng = random.Random(seed)
+    paras = [" ".join(" ".join(rng.choices(WORDS, k=rng.randint(3, 30))).capitalize() + "."
+                      for _ in range(rng.randint(1, 12))) for _ in range(paragraphs)]
+    return "\n\n".join(paras) + "\n\n" + "x" * 300 + " " + " ".join(["w"] * 80) + "\n"
+
+@pytest.mark.parametrize("max_tokens,overlap,max_chars", [(160, 0, 800), (40, 8, 240), (5, 2, 30)])
+def test_spans_are_exact_bounded_and_cover_every_token(max_tokens, overlap, max_chars):
+    text = _text()
+    chunker = Chunker(max_tokens, overlap, max_chars)
+    chunks = chunker.chunks(text)
+    for c in chunks:
+        assert c.text == text[c.start_char:c.end_char] == c.text.strip()
+        assert len(c.text) <= max_chars and count_tokens(text, c.start_char, c.end_char) <= max_tokens
+    assert [c.start_char for c in chunks] == sorted(c.start_char for c in chunks)
+    covered = bytearray(len(text))
+    for c in chunks:
+        covered[c.start_char:c.end_char] = b"\1" * (c.end_char - c.start_char)
+    assert all(covered[m.start()] for m in re.finditer(r"\S", text))
+    if not overlap:
+        assert all(a.end_char <= b.start_char for a, b in zip(chunks, chunks[1:]))
+
+def test_paragraphs_pack_whole_then_sentence_by_sentence_with_sentence_overlap():
+    text = "Short heading.\n\nOne two three. Four five six. Seven eight nine.\n\nTen eleven."
+    assert [c.text for c in Chunker(max_tokens=100).chunks(text)] == [text]
+    assert [c.text for c in Chunker(max_tokens=8).chunks(text)] == [
+        "Short heading.\n\nOne two three.", "Four five six. Seven eight nine.", "Ten eleven."]
+    assert [c.text for c in Chunker(max_tokens=8, overlap=4).chunks(text)] == [
+        "Short heading.\n\nOne two three.", "One two three. Four five six.",
+        "Four five six. Seven eight nine.", "Seven eight nine.\n\nTen eleven."]
+
+def test_oversized_sentences_become_overlapping_token_windows():
+    text = " ".join(f"w{i}" for i in range(10))
+    assert [c.text for c in Chunker(max_tokens=4, overlap=1).chunks(text)] == [
+        "w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+    assert [c.text for c in Chunker(max_tokens=4, max_chars=3).chunks("abcdefgh")] == ["abc", "def", "gh"]
+
+def test_iter_pages_streams_page_relative_offsets():
+    pages = iter(["First page. Has two sentences.", "", "Third page."])
+    chunks = list(Chunker(max_tokens=4).iter_pages(pages, first_page=10))
+    assert [(c.page, c.index, c.start_char, c.end_char, c.text) for c in chunks] == [
+        (10, 0, 0, 11, "First page."), (10, 1, 12, 30, "Has two sentences."), (12, 0, 0, 11, "Third page.")]
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Chunker(max_tokens=4, overlap=4)
+    with pytest.raises(ValueError):
+        Chunker(max_tokens=0)
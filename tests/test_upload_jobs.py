@@ -0,0 +1,87 @@
+import io, os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from fastapi.testclient import TestClient
+from reportlab.pdfgen import canvas
+from backend.app import app
+
+def _pdf(pages: int) -> bytes:
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for i in range(pages):
+        c.drawString(72, 720, f"Quarterly report page {i + 1} upload-job-test")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def _wait(client, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError("job did not finish")
+
+def test_upload_pdf_runs_as_background_job():
+    raw = _pdf(5)
+    with TestClient(app) as client:
+        res = client.post("/upload-pdf", files={"file": ("r.pdf", raw, "application/pdf")})
+        assert res.status_code == 202
+        job = _wait(client, res.json()["id"])
+        assert job["status"] == "done", job
+        assert job["pages_total"] == job["pages_done"] == 5
+
+        doc = client.get(f"/documents/{job['document_id']}").json()
+        assert [p["page_number"] for p in doc["pages"]] == [1, 2, 3, 4, 5]
+        assert "page 3" in doc["pages"][2]["text"]
+
+        again = client.post("/upload-pdf", files={"file": ("r.pdf", raw, "application/pdf")})
+        assert again.status_code == 200
+        assert again.json()["document_id"] == job["document_id"]
+        assert client.get("/jobs/nope").status_code == 404
+
+def test_upload_pdf_rejects_oversized_stream(monkeypatch):
+    import backend.app as backend_app
+    monkeypatch.setattr(backend_app, "MAX_UPLOAD_BYTES", 1024)
+    monkeypatch.setattr(backend_app, "UPLOAD_CHUNK_BYTES", 256)
+    with TestClient(app) as client:
+        res = client.post("/upload-pdf", files={"file": ("big.pdf", _pdf(40), "application/pdf")})
+        assert res.status_code == 413
+
+def test_job_state_is_readable_from_other_workers(monkeypatch):
+    import backend.app as backend_app
+    with TestClient(app) as client:
+        res = client.post("/upload-pdf", files={"file": ("w.pdf", _pdf(3) + b"%worker", "application/pdf")})
+        job = _wait(client, res.json()["id"])
+        assert job["status"] == "done"
+        # Another worker process has none of this worker's in-memory jobs.
+        monkeypatch.setattr(backend_app.extraction_jobs, "_jobs", {})
+        other = client.get(f"/jobs/{job['id']}").json()
+        assert {k: other[k] for k in ("status", "pages_done", "document_id")} == \
+            {"status": "done", "pages_done": 3, "document_id": job["document_id"]}
+
+def test_concurrent_identical_upload_resolves_to_existing_document(monkeypatch):
+    import backend.app as backend_app
+    from backend import crud
+    from backend.database import SessionLocal
+    from backend.jobs import Job
+    with TestClient(app):
+        db = SessionLocal()
+        try:
+            doc_id = crud.upsert_document_with_pages(db, "race.pdf", "e" * 64, ["first copy"]).id
+        finally:
+            db.close()
+        lookups = iter([None])  # the racing job's dedup check ran before the first commit
+        real = crud.get_document_by_hash
+        monkeypatch.setattr(crud, "get_document_by_hash", lambda db, sha: next(lookups, real(db, sha)))
+        job = Job(id="race", filename="race.pdf", sha256="e" * 64)
+        assert backend_app._persist_pages(job, ["second copy"]) == doc_id
+
+def test_concurrency_limit_is_bound_per_app_startup():
+    import backend.app as backend_app
+    with TestClient(app):
+        first = backend_app.extraction_jobs._active
+    with TestClient(app) as client:
+        assert backend_app.extraction_jobs._active is not first
+        res = client.post("/upload-pdf", files={"file": ("l.pdf", _pdf(2) + b"%loop", "application/pdf")})
+        assert _wait(client, res.json()["id"])["status"] == "done"